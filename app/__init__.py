@@ -1,4 +1,5 @@
 from config import Config
+from app.helpers.replica_helpers import RoutingSession
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -7,41 +8,154 @@ from flask_marshmallow import Marshmallow
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from redis import Redis
 import rq
-import logging
-from logging.handlers import RotatingFileHandler
-import os
+import threading
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 ma = Marshmallow()
 jwt = JWTManager()
 cors = CORS()
-limiter = Limiter(
-    key_func=get_remote_address, default_limits=["200 per day", "50 per hour"]
-)
+limiter = Limiter(key_func=get_remote_address)
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
-    app.redis = Redis.from_url(app.config["REDIS_URL"])
+
+    from app.json_provider import JSONProvider
+
+    app.json = JSONProvider(app)
+    from app.helpers.metrics_helpers import InstrumentedRedis, init_metrics
+
+    app.redis = InstrumentedRedis.from_url(app.config["REDIS_URL"])
     app.task_queue = rq.Queue("flask-api-queue", connection=app.redis)
+    app.progress_streams = threading.BoundedSemaphore(
+        app.config["TASK_PROGRESS_MAX_STREAMS"]
+    )
+
+    from app.helpers.async_helpers import EventLoopThread
+    from app.helpers.http_helpers import HTTPClient
+
+    app.event_loop = EventLoopThread("flask-api-event-loop")
+
+    # Run async views on the worker's long-lived loop rather than a new loop per
+    # request, so pooled connections and caches survive between requests
+    if app.config["ASYNC_VIEW_MODE"] == "persistent":
+        app.async_to_sync = app.event_loop.async_to_sync
+    app.http_client = HTTPClient(
+        app.event_loop,
+        limit=app.config["HTTP_CLIENT_LIMIT"],
+        limit_per_host=app.config["HTTP_CLIENT_LIMIT_PER_HOST"],
+        timeout=app.config["HTTP_CLIENT_TIMEOUT"],
+        ttl=app.config["HTTP_CACHE_TTL"],
+        stale_ttl=app.config["HTTP_CACHE_STALE_TTL"],
+        max_entries=app.config["HTTP_CACHE_MAX_ENTRIES"],
+    )
+
+    from app.helpers.engine_helpers import (
+        apply_sqlite_pragmas,
+        engine_options,
+        get_engine_profile,
+    )
+
+    # Engine options set explicitly in SQLALCHEMY_ENGINE_OPTIONS win over the profile
+    engine_profile = get_engine_profile(app.config["DATABASE_ENGINE_PROFILE"])
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(engine_profile, app.config["SQLALCHEMY_DATABASE_URI"]),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+
+    from app.helpers.replica_helpers import ReplicaRouter, replica_binds
+
+    app.replica_router = ReplicaRouter(
+        app.redis,
+        replica_binds(app.config),
+        pin_seconds=app.config["REPLICA_PIN_SECONDS"],
+    )
+
+    from app.helpers.async_db_helpers import (
+        AsyncDatabase,
+        async_database_uri,
+        async_replica_uris,
+    )
+
+    async_uri = async_database_uri(app.config)
+    app.async_db = AsyncDatabase(
+        async_uri,
+        app.event_loop,
+        engine_options=engine_options(engine_profile, async_uri) if async_uri else None,
+        sqlite_pragmas=engine_profile["sqlite_pragmas"],
+        replica_uris=(
+            async_replica_uris(app.config, app.replica_router.binds)
+            if async_uri
+            else None
+        ),
+    )
+
+    from app.helpers.revocation_helpers import RevokedTokenStore
+
+    app.revoked_tokens = RevokedTokenStore(
+        app.redis,
+        capacity=app.config["JWT_REVOCATION_BLOOM_CAPACITY"],
+        error_rate=app.config["JWT_REVOCATION_BLOOM_ERROR_RATE"],
+        sync_interval=app.config["JWT_REVOCATION_SYNC_INTERVAL"],
+    )
+
+    from app.helpers.password_helpers import PasswordHasher
+
+    app.password_hasher = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        max_workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+    )
+
+    from app.helpers.user_cache_helpers import UserIdentityCache
+
+    app.user_cache = UserIdentityCache(
+        app.redis,
+        maxsize=app.config["USER_CACHE_SIZE"],
+        ttl=app.config["USER_CACHE_TTL"],
+        redis_ttl=app.config["USER_CACHE_REDIS_TTL"],
+    )
+
+    from app.helpers.timeline_helpers import Timeline
+
+    app.timeline = Timeline(
+        app.redis,
+        max_length=app.config["TIMELINE_MAX_LENGTH"],
+        ttl=app.config["TIMELINE_TTL"],
+    )
 
     with app.app_context():
         db.init_app(app)
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, engine_profile["sqlite_pragmas"])
+
+        from app.models import include_search_index
 
         # TODO: check if this is relevant for the template
         if db.engine.url.drivername == "sqlite":
-            migrate.init_app(app, db, render_as_batch=True, compare_type=True)
+            migrate.init_app(
+                app,
+                db,
+                render_as_batch=True,
+                compare_type=True,
+                include_object=include_search_index,
+            )
         else:
-            migrate.init_app(app, db, compare_type=True)
+            migrate.init_app(
+                app, db, compare_type=True, include_object=include_search_index
+            )
 
         ma.init_app(app)
         jwt.init_app(app)
         cors.init_app(app)
+
+        from app.helpers.rate_limit_helpers import register_prefetch_strategy
+
+        register_prefetch_strategy(app.config["RATELIMIT_PREFETCH_SIZE"])
         limiter.init_app(app)
 
     from app.errors import bp as errors_bp
@@ -50,6 +164,8 @@ def create_app(config_class=Config):
     from app.comments import bp as comments_bp
     from app.auth import bp as auth_bp
     from app.tasks import bp as tasks_bp
+    from app.search import bp as search_bp
+    from app.metrics import bp as metrics_bp
 
     app.register_blueprint(errors_bp)
     app.register_blueprint(users_bp, url_prefix="/api/users")
@@ -57,26 +173,48 @@ def create_app(config_class=Config):
     app.register_blueprint(comments_bp, url_prefix="/api/comments")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(tasks_bp, url_prefix="/api/tasks")
+    app.register_blueprint(search_bp, url_prefix="/api/search")
+
+    if app.config["METRICS_ENABLED"]:
+        app.register_blueprint(metrics_bp)
+        init_metrics(app)
 
-    # Set the rate limit for all routes in the auth_bp blueprint to 1 per second
-    limiter.limit("60 per minute")(auth_bp)
+    from app.helpers.query_budget_helpers import init_query_budgets
 
-    # Set the debuging to rotating log files and the log format and settings
+    init_query_budgets(app)
+
+    # Write the logs as JSON lines to rotating log files from a background thread
     if not app.debug:
-        if not os.path.exists("logs"):
-            os.mkdir("logs")
-        file_handler = RotatingFileHandler(
-            "logs/flask_api.log", maxBytes=10240, backupCount=10
-        )
-        file_handler.setFormatter(
-            logging.Formatter(
-                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
-            )
-        )
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+        from app.helpers.logging_helpers import init_logging
 
-        app.logger.setLevel(logging.INFO)
+        init_logging(app)
         app.logger.info("Flask API startup")
 
     return app
+
+
+def create_asgi_app(config_class=Config):
+    """
+    Create the app wrapped as an ASGI application, so it can be served by an ASGI
+    server such as Uvicorn. Up to ASGI_WORKER_THREADS requests are served concurrently,
+    progress streams hold a thread each on top of those
+
+    Parameters
+    ----------
+    config_class : Config
+        The config of the app
+
+    Returns
+    -------
+    ThreadedWsgiToAsgi
+        The ASGI application
+    """
+    from app.helpers.asgi_helpers import ThreadedWsgiToAsgi
+
+    app = create_app(config_class)
+
+    return ThreadedWsgiToAsgi(
+        app,
+        max_workers=app.config["ASGI_WORKER_THREADS"]
+        + app.config["TASK_PROGRESS_MAX_STREAMS"],
+    )
@@ -1,5 +1,11 @@
-from flask import Blueprint
+from flask import Blueprint, current_app
+
+from app import limiter
 
 bp = Blueprint("auth", __name__)
 
+# Set the rate limit for all routes in the blueprint, 1 per second by default. It is
+# registered once here as the limiter is shared by every app created in the process
+limiter.limit(lambda: current_app.config["RATELIMIT_AUTH"])(bp)
+
 from app.auth import routes
@@ -1,10 +1,13 @@
-from flask import Response, request, jsonify
+from datetime import datetime
+
+from flask import Response, current_app, request, jsonify
 
 from app import db, jwt
 from app.auth import bp
-from app.models import Users, RevokedTokenModel
+from app.models import Users
 from app.schemas import UsersDeserializingSchema
 from app.errors.handlers import bad_request, error_response
+from app.helpers.password_helpers import HasherBusy
 
 from flask_jwt_extended import (
     create_access_token,
@@ -23,8 +26,7 @@ user_schema = UsersDeserializingSchema()
 @jwt.token_in_blocklist_loader
 def check_if_token_in_blacklist(jwt_header, jwt_data) -> bool:
     """
-    Helper function for checking if a token is present in the database
-    revoked token table
+    Helper function for checking if a token is present in the revoked token store
 
     Parameters
     ----------
@@ -39,7 +41,7 @@ def check_if_token_in_blacklist(jwt_header, jwt_data) -> bool:
         Returns True if the token is revoked, False otherwise
     """
     jti = jwt_data["jti"]
-    return RevokedTokenModel.is_jti_blacklisted(jti)
+    return current_app.revoked_tokens.is_revoked(jti)
 
 
 @bp.post("/register")
@@ -72,7 +74,11 @@ def register() -> tuple[Response, int] | Response:
         birthday=result["birthday"],
     )
 
-    user.set_password(result["password"])
+    try:
+        user.set_password(result["password"])
+
+    except HasherBusy:
+        return error_response(503, message="Too many authentication requests")
 
     db.session.add(user)
     db.session.commit()
@@ -98,8 +104,15 @@ def login() -> tuple[Response, int] | Response:
 
     user = Users.query.filter_by(username=result["username"]).first()
 
-    if user is None or not user.check_password(result["password"]):
-        return error_response(401, message="Invalid username or password")
+    try:
+        if user is None or not user.check_password(result["password"]):
+            return error_response(401, message="Invalid username or password")
+
+        if user.rehash_password(result["password"]):
+            db.session.commit()
+
+    except HasherBusy:
+        return error_response(503, message="Too many authentication requests")
 
     tokens = {
         "access_token": create_access_token(identity=user.id, fresh=True),
@@ -146,8 +159,15 @@ def fresh_login() -> tuple[Response, int] | Response:
 
     user = Users.query.filter_by(username=result["username"]).first()
 
-    if user is None or not user.check_password(result["password"]):
-        return error_response(401, message="Invalid username or password")
+    try:
+        if user is None or not user.check_password(result["password"]):
+            return error_response(401, message="Invalid username or password")
+
+        if user.rehash_password(result["password"]):
+            db.session.commit()
+
+    except HasherBusy:
+        return error_response(503, message="Too many authentication requests")
 
     new_token = create_access_token(identity=user.id, fresh=True)
     payload = {"access_token": new_token}
@@ -166,9 +186,10 @@ def logout_access_token() -> tuple[Response, int]:
     str
         A JSON object containing the sucess message
     """
-    jti = get_jwt()["jti"]
-    revoked_token = RevokedTokenModel(jti=jti)
-    revoked_token.add()
+    jwt_data = get_jwt()
+    current_app.revoked_tokens.revoke(
+        jwt_data["jti"], datetime.utcfromtimestamp(jwt_data["exp"])
+    )
 
     return jsonify({"msg": "Successfully logged out"}), 200
 
@@ -184,8 +205,9 @@ def logout_refresh_token() -> tuple[Response, int]:
     str
         A JSON object containing a success message
     """
-    jti = get_jwt()["jti"]
-    revoked_token = RevokedTokenModel(jti=jti)
-    revoked_token.add()
+    jwt_data = get_jwt()
+    current_app.revoked_tokens.revoke(
+        jwt_data["jti"], datetime.utcfromtimestamp(jwt_data["exp"])
+    )
 
     return jsonify({"msg": "Successfully logged out"}), 200
@@ -1,29 +1,42 @@
 from typing import Any
-from flask import request, jsonify, Response
+from flask import current_app, request, jsonify, Response
 
 from app import db
 from app.comments import bp
 from app.models import Comments, Posts
 from app.schemas import CommentsSchema, CommentsDeserializingSchema
+from app.serializers import compile_schema
 from app.errors.handlers import bad_request
+from app.helpers.counter_helpers import adjust_counters
+from app.helpers.field_helpers import select_fields
+from app.helpers.pagination_helpers import keyset, split_page
+from app.helpers.streaming_helpers import stream
+from app.helpers.query_budget_helpers import query_budget
+from app.helpers.replica_helpers import read_only
 
 from flask_jwt_extended import jwt_required, current_user
 
 from marshmallow import ValidationError
 
 import asyncio
-from aiohttp import ClientSession
 
 comment_schema = CommentsSchema()
 comments_schema = CommentsSchema(many=True)
+comments_serializer = compile_schema(comments_schema)
 comment_deserializing_schema = CommentsDeserializingSchema()
 
 
 @bp.get("/get/user/comments/post/<int:id>")
+@query_budget(3)
 @jwt_required()
-def get_comments_by_post_id(id: int) -> Response:
+@read_only
+def get_comments_by_post_id(id: int) -> tuple[Response, int] | Response:
     """
-    Endpoint for retrieving the user comments associated with a particular post
+    Endpoint for retrieving a page of the user comments associated with a particular
+    post, newest first, read through an async session. The `limit` and `cursor` query
+    parameters select the page. With the `stream` query parameter set to `json` or
+    `ndjson` all comments are streamed instead. The `fields` query parameter selects
+    the returned fields
 
     Parameters
     ----------
@@ -33,13 +46,38 @@ def get_comments_by_post_id(id: int) -> Response:
     Returns
     -------
     str
-        A JSON object containing the comments
+        A JSON object containing the comments and the cursor of the next page
     """
-    comments = Comments.query.filter_by(post_id=id).all()
-    return comments_schema.jsonify(comments)
+    columns = (Comments.timestamp, Comments.id)
+
+    try:
+        serializer = select_fields(comments_serializer)
+
+        # Streams are built by this sync view, a streamed response keeps the request
+        # context which an async view would have entered on another thread
+        if request.args.get("stream"):
+            query = Comments.query.filter_by(post_id=id).with_entities(
+                *serializer.columns
+            )
+            return stream(query, serializer, *columns)
+
+        statement, limit = keyset(
+            serializer.select(*columns).where(Comments.post_id == id), *columns
+        )
+    except ValueError as e:
+        return bad_request(str(e))
+
+    result = current_app.ensure_sync(current_app.async_db.execute)(statement)
+    comments, next_cursor = split_page(result.all(), limit, *columns)
+
+    return (
+        jsonify({"comments": serializer.dump(comments), "next": next_cursor}),
+        200,
+    )
 
 
 @bp.post("/post/user/submit/comment")
+@query_budget(6)
 @jwt_required()
 def submit_comment() -> tuple[Response, int] | Response:
     """
@@ -63,15 +101,17 @@ def submit_comment() -> tuple[Response, int] | Response:
     if post.user_id != current_user.id:
         return bad_request("Unauthorized")
 
-    comment = Comments(body=result["body"], post=post, user=current_user)
+    comment = Comments(body=result["body"], post=post, user_id=current_user.id)
 
     db.session.add(comment)
+    adjust_counters(current_user.id, post_id=post.id, comments=1)
     db.session.commit()
 
     return jsonify({"msg": "Comment succesfully submitted"}), 201
 
 
 @bp.delete("/delete/user/comment/<int:id>")
+@query_budget(6)
 @jwt_required()
 def delete_comment(id: int) -> tuple[Response, int] | Response:
     """
@@ -96,12 +136,14 @@ def delete_comment(id: int) -> tuple[Response, int] | Response:
         return bad_request("Unauthorized")
 
     db.session.delete(comment)
+    adjust_counters(comment.user_id, post_id=comment.post_id, comments=-1)
     db.session.commit()
 
     return jsonify({"msg": "Comment succesfully deleted"}), 201
 
 
 @bp.get("/get/user/comments/async")
+@query_budget(1)
 @jwt_required()
 async def async_comments_api_call() -> dict[str, list[Any]]:
     """
@@ -112,18 +154,11 @@ async def async_comments_api_call() -> dict[str, list[Any]]:
     str
         A JSON object containing the comment
     """
-    urls = [
-        "https://jsonplaceholder.typicode.com/comments",
-        "https://jsonplaceholder.typicode.com/comments",
-        "https://jsonplaceholder.typicode.com/comments",
-        "https://jsonplaceholder.typicode.com/comments",
-        "https://jsonplaceholder.typicode.com/comments",
-    ]
-
-    async with ClientSession() as session:
-        tasks = (session.get(url) for url in urls)
-        user_posts_res = await asyncio.gather(*tasks)
-        json_res = [await r.json() for r in user_posts_res]
+    urls = ["{}/comments".format(current_app.config["EXTERNAL_API_URL"])] * 5
+
+    # Identical URLs share one upstream call and responses are cached by the client
+    client = current_app.http_client
+    json_res = await asyncio.gather(*(client.get_json(url) for url in urls))
 
     response_data = {"comments": json_res}
 
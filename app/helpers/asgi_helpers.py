@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """
+    Per-request instance of `ThreadedWsgiToAsgi` which runs the WSGI app on a thread
+    of the given pool. The response is closed when it is done, also when the client
+    went away before, so callbacks registered with `call_on_close` always run
+    """
+
+    def __init__(self, wsgi_application, executor: ThreadPoolExecutor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+        self.disconnected = threading.Event()
+
+    async def __call__(self, scope, receive, send) -> None:
+        self.receive = receive
+        await super().__call__(scope, receive, send)
+
+    async def run_wsgi_app(self, body) -> None:
+        watcher = asyncio.ensure_future(self.watch_disconnect())
+
+        try:
+            await sync_to_async(
+                self.serve, thread_sensitive=False, executor=self.executor
+            )(body)
+        finally:
+            watcher.cancel()
+
+    async def watch_disconnect(self) -> None:
+        # Once the request body is read the next message only arrives when the client
+        # disconnects
+        message = await self.receive()
+
+        if message["type"] == "http.disconnect":
+            self.disconnected.set()
+
+    def serve(self, body) -> None:
+        """
+        Run the WSGI app and send its response, stopping between chunks when the
+        client disconnected
+
+        Parameters
+        ----------
+        body : SpooledTemporaryFile
+            The request body
+        """
+        environ = self.build_environ(self.scope, body)
+        response = self.wsgi_application(environ, self.start_response)
+        bytes_sent = 0
+
+        try:
+            for output in response:
+                if self.disconnected.is_set():
+                    return
+
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+
+                # Never send more than the Content-Length header announced
+                if self.response_content_length is not None:
+                    output = output[: self.response_content_length - bytes_sent]
+
+                self.sync_send(
+                    {"type": "http.response.body", "body": output, "more_body": True}
+                )
+                bytes_sent += len(output)
+
+                if bytes_sent == self.response_content_length:
+                    break
+
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+
+            self.sync_send({"type": "http.response.body"})
+
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """
+    Wraps a WSGI app as an ASGI app like asgiref's `WsgiToAsgi`, which runs every
+    request on one shared thread (it is thread sensitive). Here requests run on a
+    pool of `max_workers` threads instead, so one process serves that many requests
+    concurrently while they wait on I/O
+
+    Parameters
+    ----------
+    wsgi_application : Flask
+        The WSGI app
+    max_workers : int
+        The number of requests served concurrently
+    """
+
+    def __init__(self, wsgi_application, max_workers: int = 32):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="asgi"
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application, self.executor)(
+            scope, receive, send
+        )
@@ -0,0 +1,177 @@
+import asyncio
+import importlib.util
+
+from flask import g, has_app_context
+
+from sqlalchemy.engine import Result, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import db
+from app.helpers.async_helpers import EventLoopThread
+from app.helpers.engine_helpers import apply_sqlite_pragmas
+
+# Async drivers used for the synchronous drivers of SQLALCHEMY_DATABASE_URI
+ASYNC_DRIVERS = {
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+}
+
+
+def to_async_uri(uri: str) -> str | None:
+    """
+    Helper function which converts a database URI to the matching async driver
+
+    Parameters
+    ----------
+    uri : str
+        The URI of a synchronous engine
+
+    Returns
+    -------
+    str | None
+        The URI for the async driver, None if the driver is not installed or the
+        database can not be shared between engines
+    """
+    url = make_url(uri)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+
+    # An in-memory SQLite database can not be shared with a second driver
+    if driver is None or (url.drivername == "sqlite" and not url.database):
+        return None
+
+    if importlib.util.find_spec(driver[1]) is None:
+        return None
+
+    return url.set(drivername=driver[0]).render_as_string(hide_password=False)
+
+
+def async_database_uri(config: dict) -> str | None:
+    """
+    Helper function which determines the URI of the async engine. It is taken from
+    SQLALCHEMY_ASYNC_DATABASE_URI or derived from SQLALCHEMY_DATABASE_URI when the
+    matching async driver is installed
+
+    Parameters
+    ----------
+    config : dict
+        The config of the app
+
+    Returns
+    -------
+    str | None
+        The URI of the async engine, None if async sessions are unavailable
+    """
+    if config.get("SQLALCHEMY_ASYNC_DATABASE_URI"):
+        return config["SQLALCHEMY_ASYNC_DATABASE_URI"]
+
+    return to_async_uri(config["SQLALCHEMY_DATABASE_URI"])
+
+
+def async_replica_uris(config: dict, binds: list) -> dict:
+    """
+    Helper function which derives the async URIs of the read replica binds
+
+    Parameters
+    ----------
+    config : dict
+        The config of the app
+    binds : list
+        The bind keys of the replicas
+
+    Returns
+    -------
+    dict
+        The async URI per bind key, replicas without an async driver are left out
+    """
+    uris = {}
+
+    for key in binds:
+        bind = config["SQLALCHEMY_BINDS"][key]
+        uri = to_async_uri(bind["url"] if isinstance(bind, dict) else bind)
+
+        if uri is not None:
+            uris[key] = uri
+
+    return uris
+
+
+class AsyncDatabase:
+    """
+    SQLAlchemy async sessions for the hot read endpoints. Statements run on the
+    worker's long-lived event loop, so a slow query waits on the loop instead of
+    holding a worker thread and one connection pool serves every request. Without an
+    async driver statements run on the regular synchronous session in a thread of the
+    loop's executor, so they never block the loop shared by the async views. Statements
+    of read only views go to the replica chosen for the request when it has an async
+    engine
+
+    Parameters
+    ----------
+    uri : str | None
+        The URI of the async engine, None to use the synchronous session
+    loop_thread : EventLoopThread
+        The event loop the engine runs on
+    engine_options : dict | None
+        Keyword arguments for `create_async_engine`
+    sqlite_pragmas : dict | None
+        Pragmas run on every new connection of a SQLite database
+    replica_uris : dict | None
+        The async URIs of the read replicas per bind key
+    """
+
+    def __init__(
+        self,
+        uri: str | None,
+        loop_thread: EventLoopThread,
+        engine_options: dict | None = None,
+        sqlite_pragmas: dict | None = None,
+        replica_uris: dict | None = None,
+    ):
+        self.uri = uri
+        self.loop_thread = loop_thread
+        self.engine_options = engine_options or {"pool_pre_ping": True}
+        self.sqlite_pragmas = sqlite_pragmas
+        self.replica_uris = replica_uris or {}
+        self._sessionmakers = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.uri is not None
+
+    async def execute(self, statement) -> Result:
+        """
+        Execute a read statement
+
+        Parameters
+        ----------
+        statement : Executable
+            The statement to execute
+
+        Returns
+        -------
+        Result
+            The buffered result of the statement
+        """
+        if not self.enabled:
+            # The thread runs in a copy of the caller's context, so it uses the
+            # session of the request
+            return await asyncio.to_thread(db.session.execute, statement)
+
+        bind = g.get("read_bind") if has_app_context() else None
+
+        return await self.loop_thread.run_async(
+            self._execute(statement, bind if bind in self.replica_uris else None)
+        )
+
+    async def _execute(self, statement, bind: str | None) -> Result:
+        if bind not in self._sessionmakers:
+            engine = create_async_engine(
+                self.replica_uris.get(bind, self.uri), **self.engine_options
+            )
+            apply_sqlite_pragmas(engine.sync_engine, self.sqlite_pragmas)
+            self._sessionmakers[bind] = async_sessionmaker(
+                engine, expire_on_commit=False
+            )
+
+        async with self._sessionmakers[bind]() as session:
+            return await session.execute(statement)
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from functools import wraps
+
+
+class EventLoopThread:
+    """
+    A long-lived event loop running in a daemon thread, one per worker process.
+    The thread is started on first use and restarted in a forked child, so it is safe
+    to create before a prefork server forks its workers
+
+    Parameters
+    ----------
+    name : str
+        The name of the thread
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        The event loop of this worker process, started when needed
+        """
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever, name=self.name, daemon=True
+                    ).start()
+                    self._loop, self._pid = loop, os.getpid()
+
+        return self._loop
+
+    def submit(self, coro) -> Future:
+        """
+        Schedule a coroutine on the loop from any thread, the task runs in a copy of the
+        calling thread's context
+
+        Parameters
+        ----------
+        coro : coroutine
+            The coroutine to run
+
+        Returns
+        -------
+        Future
+            A concurrent future with the result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def async_to_sync(self, func):
+        """
+        Wrap a coroutine function so calling it runs the coroutine on this loop and
+        blocks until it is done. Can replace `Flask.async_to_sync` so async views run
+        on the long-lived loop instead of a new loop per request. The context variables
+        of the calling thread, such as Flask's request and app context, are copied to
+        the task
+
+        Parameters
+        ----------
+        func : coroutine function
+            The coroutine function to wrap
+
+        Returns
+        -------
+        function
+            A synchronous function returning the result of the coroutine
+        """
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.submit(func(*args, **kwargs)).result()
+
+        return wrapper
+
+    async def run_async(self, coro):
+        """
+        Await a coroutine on the loop from a coroutine running on any other loop
+
+        Parameters
+        ----------
+        coro : coroutine
+            The coroutine to run
+
+        Returns
+        -------
+        object
+            The result of the coroutine
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self.loop:
+            return await coro
+
+        return await asyncio.wrap_future(self.submit(coro))
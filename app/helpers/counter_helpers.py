@@ -0,0 +1,102 @@
+from sqlalchemy import func, or_, select, update
+
+from app import db
+from app.models import Comments, Posts, Users
+
+
+def adjust_counters(
+    user_id: int, post_id: int | None = None, posts: int = 0, comments: int = 0
+) -> None:
+    """
+    Helper function which adjusts the denormalized post and comment counts within the
+    current transaction. The counts are incremented in SQL, so concurrent requests
+    can not overwrite each other's changes
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user who wrote the post or comment
+    post_id : int | None
+        The ID of the post the comment belongs to
+    posts : int
+        The change of the number of posts of the user
+    comments : int
+        The change of the number of comments of the user and the post
+    """
+    db.session.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(
+            post_count=Users.post_count + posts,
+            comment_count=Users.comment_count + comments,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    if post_id is not None and comments:
+        db.session.execute(
+            update(Posts)
+            .where(Posts.id == post_id)
+            .values(comment_count=Posts.comment_count + comments)
+            .execution_options(synchronize_session=False)
+        )
+
+    # The cached identity of the user includes the counts
+    db.session.info.setdefault("changed_users", set()).add(user_id)
+
+
+def rebuild_counters(chunk_size: int = 500) -> tuple[int, int]:
+    """
+    Helper function which recounts the posts and comments of every user and post
+    from the source tables, only rows with a wrong count are updated
+
+    Parameters
+    ----------
+    chunk_size : int
+        The number of users updated per statement
+
+    Returns
+    -------
+    tuple[int, int]
+        The number of users and the number of posts which were corrected
+    """
+    user_posts = (
+        select(func.count(Posts.id)).where(Posts.user_id == Users.id).scalar_subquery()
+    )
+    user_comments = (
+        select(func.count(Comments.id))
+        .where(Comments.user_id == Users.id)
+        .scalar_subquery()
+    )
+    post_comments = (
+        select(func.count(Comments.id))
+        .where(Comments.post_id == Posts.id)
+        .scalar_subquery()
+    )
+
+    user_ids = db.session.scalars(
+        select(Users.id).where(
+            or_(Users.post_count != user_posts, Users.comment_count != user_comments)
+        )
+    ).all()
+
+    for start in range(0, len(user_ids), chunk_size):
+        db.session.execute(
+            update(Users)
+            .where(Users.id.in_(user_ids[start : start + chunk_size]))
+            .values(post_count=user_posts, comment_count=user_comments)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.session.info.setdefault("changed_users", set()).update(user_ids)
+
+    posts = db.session.execute(
+        update(Posts)
+        .where(Posts.comment_count != post_comments)
+        .values(comment_count=post_comments)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.session.commit()
+
+    return len(user_ids), posts
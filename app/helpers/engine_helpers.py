@@ -0,0 +1,138 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Named engine tuning profiles for DATABASE_ENGINE_PROFILE. The pool settings apply
+# to every server database and file based SQLite database, the pragmas are run on
+# every new SQLite connection
+ENGINE_PROFILES = {
+    "default": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "statement_cache_size": 500,
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 64 * 1024 * 1024,
+        },
+    },
+    "high-concurrency": {
+        "pool_size": 20,
+        "max_overflow": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 900,
+        "statement_cache_size": 1200,
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 15000,
+            "mmap_size": 256 * 1024 * 1024,
+        },
+    },
+    "low-memory": {
+        "pool_size": 2,
+        "max_overflow": 3,
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+        "statement_cache_size": 100,
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 0,
+        },
+    },
+}
+
+
+def get_engine_profile(name: str) -> dict:
+    """
+    Helper function to look up an engine tuning profile
+
+    Parameters
+    ----------
+    name : str
+        The name of the profile
+
+    Returns
+    -------
+    dict
+        The settings of the profile
+    """
+    try:
+        return ENGINE_PROFILES[name]
+
+    except KeyError:
+        raise ValueError(
+            "Unknown engine profile {}, expected one of {}".format(
+                name, ", ".join(ENGINE_PROFILES)
+            )
+        )
+
+
+def engine_options(profile: dict, uri: str) -> dict:
+    """
+    Helper function to build the SQLAlchemy engine options of a profile for a
+    database URI
+
+    Parameters
+    ----------
+    profile : dict
+        The settings of the profile
+    uri : str
+        The URI of the database
+
+    Returns
+    -------
+    dict
+        Keyword arguments for `create_engine`
+    """
+    url = make_url(uri)
+    options = {
+        "pool_pre_ping": profile["pool_pre_ping"],
+        "query_cache_size": profile["statement_cache_size"],
+    }
+
+    # In-memory SQLite databases use a single static connection and aiosqlite opens a
+    # connection per checkout, neither has a pool to size
+    if url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.get_driver_name() == "aiosqlite"
+    ):
+        return options
+
+    options.update(
+        pool_size=profile["pool_size"],
+        max_overflow=profile["max_overflow"],
+        pool_recycle=profile["pool_recycle"],
+    )
+
+    return options
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict) -> None:
+    """
+    Helper function to run the pragmas of a profile on every new connection of a
+    SQLite engine, engines of other databases are left untouched. WAL lets readers
+    run next to a writer, `busy_timeout` makes a blocked writer wait instead of
+    failing with "database is locked"
+
+    Parameters
+    ----------
+    engine : Engine
+        The engine, the sync engine of an async engine
+    pragmas : dict
+        The pragma names and values to set
+    """
+    if engine.url.get_backend_name() != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA {}={}".format(name, value))
+
+        cursor.close()
@@ -0,0 +1,33 @@
+from flask import request
+
+from app.serializers import CompiledSchema
+
+
+def select_fields(serializer: CompiledSchema) -> CompiledSchema:
+    """
+    Helper function which narrows a compiled schema down to the comma separated field
+    names of the `fields` request argument, so only their columns are selected and
+    serialized. Without the argument the schema is returned as is
+
+    Parameters
+    ----------
+    serializer : CompiledSchema
+        The compiled schema of the route
+
+    Returns
+    -------
+    CompiledSchema
+        The compiled schema of the requested fields
+
+    Raises
+    ------
+    ValueError
+        If a requested field is not a field of the schema
+    """
+    fields = request.args.get("fields", "").split(",")
+    names = [name for name in map(str.strip, fields) if name]
+
+    if not names:
+        return serializer
+
+    return serializer.only(names)
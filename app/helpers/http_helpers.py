@@ -0,0 +1,144 @@
+import asyncio
+from collections import OrderedDict
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from app.helpers.async_helpers import EventLoopThread
+
+
+class HTTPClient:
+    """
+    App scoped HTTP client for calls to upstream APIs. All requests run on the
+    worker's long-lived event loop, which owns a single pooled ClientSession with
+    per-host connection limits and timeouts, so connections and TLS sessions are
+    reused across requests. Concurrent requests for the same URL share one upstream
+    call and JSON responses are cached: fresh entries are served as is, stale entries
+    are served while a refresh runs in the background
+
+    Parameters
+    ----------
+    loop_thread : EventLoopThread
+        The event loop the client runs on
+    limit : int
+        The maximum number of open connections
+    limit_per_host : int
+        The maximum number of open connections per host
+    timeout : float
+        The total timeout of a request in seconds
+    ttl : float
+        The number of seconds a response is fresh
+    stale_ttl : float
+        The number of seconds after `ttl` a response is still served while revalidated
+    max_entries : int
+        The maximum number of cached responses
+    """
+
+    def __init__(
+        self,
+        loop_thread: EventLoopThread,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        timeout: float = 10.0,
+        ttl: float = 60.0,
+        stale_ttl: float = 300.0,
+        max_entries: int = 256,
+    ):
+        self.loop_thread = loop_thread
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._session = None
+        self._session_loop = None
+        self._inflight = {}
+        self._cache = OrderedDict()
+
+    async def get_json(self, url: str) -> object:
+        """
+        Retrieve the JSON document at an URL, from the cache when possible
+
+        Parameters
+        ----------
+        url : str
+            The URL to retrieve
+
+        Returns
+        -------
+        object
+            The decoded JSON document
+        """
+        return await self.loop_thread.run_async(self._get_json(url))
+
+    async def _get_json(self, url: str) -> object:
+        entry = self._cache.get(url)
+
+        if entry is not None:
+            age = asyncio.get_running_loop().time() - entry[0]
+
+            if age < self.ttl:
+                self._cache.move_to_end(url)
+                return entry[1]
+
+            if age < self.ttl + self.stale_ttl:
+                self._fetch(url)
+                return entry[1]
+
+        return await asyncio.shield(self._fetch(url))
+
+    def _fetch(self, url: str) -> asyncio.Task:
+        """
+        Start an upstream request for an URL, or join the one already in flight
+        """
+        task = self._inflight.get(url)
+
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._request(url))
+            task.add_done_callback(lambda done: self._request_done(url, done))
+            self._inflight[url] = task
+
+        return task
+
+    def _request_done(self, url: str, task: asyncio.Task) -> None:
+        self._inflight.pop(url, None)
+
+        # Mark the exception of a background refresh nobody awaits as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _request(self, url: str) -> object:
+        loop = asyncio.get_running_loop()
+
+        if self._session is None or self._session_loop is not loop:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self.limit, limit_per_host=self.limit_per_host
+                ),
+                timeout=ClientTimeout(total=self.timeout),
+                raise_for_status=True,
+            )
+            self._session_loop = loop
+
+        async with self._session.get(url) as response:
+            data = await response.json()
+
+        self._cache[url] = (loop.time(), data)
+        self._cache.move_to_end(url)
+
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+        return data
+
+    async def _close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self) -> None:
+        """
+        Close the pooled session, for instance when the worker shuts down
+        """
+        if self._session is not None:
+            self.loop_thread.submit(self._close()).result()
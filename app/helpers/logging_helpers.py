@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import Flask, Response, g, has_app_context, request
+
+# Incoming X-Request-ID headers are reused when they look like an ID
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats log records as single line JSON objects
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "location": "{}:{}".format(record.pathname, record.lineno),
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+class RequestIDFilter(logging.Filter):
+    """
+    Adds the correlation ID of the current request to every record
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = g.get("request_id") if has_app_context() else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the records at INFO level and below, warnings and errors
+    are always kept
+
+    Parameters
+    ----------
+    rate : float
+        The fraction of INFO and lower records to keep, between 0 and 1
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class BackgroundLogHandler(QueueHandler):
+    """
+    Handler which only puts records on a queue, a listener thread formats and writes
+    them with the given handlers so request threads never wait on file I/O. The
+    listener is started on the first record and restarted in a forked child
+
+    Parameters
+    ----------
+    handlers : list
+        The handlers writing the records
+    """
+
+    def __init__(self, *handlers: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self.handlers = handlers
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener, only the message arguments are merged
+        # so the record no longer references objects of the request
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+
+        record.exc_info = None
+
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._listener is None or self._pid != os.getpid():
+            with self._lock:
+                if self._listener is None or self._pid != os.getpid():
+                    self.queue = queue.SimpleQueue()
+                    self._listener = QueueListener(
+                        self.queue, *self.handlers, respect_handler_level=True
+                    )
+                    self._listener.start()
+                    self._pid = os.getpid()
+
+        super().emit(record)
+
+    def close(self) -> None:
+        """
+        Write the queued records and stop the listener
+        """
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+                self._listener = None
+
+        for handler in self.handlers:
+            handler.close()
+
+        super().close()
+
+
+def _assign_request_id() -> None:
+    request_id = request.headers.get("X-Request-ID", "")
+    g.request_id = (
+        request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+    )
+
+
+def _return_request_id(response: Response) -> Response:
+    if g.get("request_id"):
+        response.headers["X-Request-ID"] = g.request_id
+
+    return response
+
+
+def init_logging(app: Flask) -> BackgroundLogHandler:
+    """
+    Helper function to write the logs of the app as JSON lines to a rotating file off
+    the request path. Every request gets a correlation ID, taken from a valid
+    X-Request-ID header or generated, which is added to its log records and returned
+    in the X-Request-ID response header. The app logger is shared by every app of the
+    process, the handlers of earlier apps are closed and replaced
+
+    Parameters
+    ----------
+    app : Flask
+        The app to configure
+
+    Returns
+    -------
+    BackgroundLogHandler
+        The handler added to the app logger
+    """
+    app.before_request(_assign_request_id)
+    app.after_request(_return_request_id)
+
+    os.makedirs(app.config["LOG_DIR"], exist_ok=True)
+
+    file_handler = RotatingFileHandler(
+        os.path.join(app.config["LOG_DIR"], app.config["LOG_FILE"]),
+        maxBytes=app.config["LOG_MAX_BYTES"],
+        backupCount=app.config["LOG_BACKUP_COUNT"],
+    )
+    file_handler.setFormatter(JSONFormatter())
+
+    handler = BackgroundLogHandler(file_handler)
+    handler.addFilter(SamplingFilter(app.config["LOG_INFO_SAMPLE_RATE"]))
+    handler.addFilter(RequestIDFilter())
+
+    for previous in list(app.logger.handlers):
+        if isinstance(previous, BackgroundLogHandler):
+            app.logger.removeHandler(previous)
+            previous.close()
+
+    app.logger.addHandler(handler)
+    app.logger.setLevel(app.config["LOG_LEVEL"])
+
+    return handler
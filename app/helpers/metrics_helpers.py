@@ -0,0 +1,189 @@
+import os
+import time
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from redis import Redis
+from redis.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# The metrics are module level so every worker process registers them once. With
+# PROMETHEUS_MULTIPROC_DIR set they are written to files in that directory, which the
+# /metrics endpoint of any worker aggregates
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests",
+    ["method", "endpoint", "status"],
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of HTTP response bodies",
+    ["method", "endpoint"],
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000),
+)
+SQL_STATEMENTS = Counter(
+    "sql_statements_total", "Number of SQL statements executed", ["endpoint"]
+)
+SQL_DURATION = Histogram(
+    "sql_request_duration_seconds",
+    "Time spent executing SQL statements per request",
+    ["endpoint"],
+)
+REDIS_CALLS = Counter(
+    "redis_commands_total", "Number of Redis commands executed", ["endpoint"]
+)
+
+
+class InstrumentedPipeline(Pipeline):
+    """
+    Redis pipeline which counts one command per round trip of the current request
+    """
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        start = time.perf_counter()
+
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            record("redis", time.perf_counter() - start)
+
+
+class InstrumentedRedis(Redis):
+    """
+    Redis connection which counts the commands of the current request and the time
+    spent on them
+    """
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            record("redis", time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+def record(kind: str, duration: float) -> None:
+    """
+    Helper function to add a SQL statement or Redis command to the timings of the
+    current request, calls outside of a request are ignored
+
+    Parameters
+    ----------
+    kind : str
+        Either "sql" or "redis"
+    duration : float
+        The duration of the call in seconds
+    """
+    if not has_app_context():
+        return
+
+    timings = g.get("timings")
+
+    if timings is not None:
+        timings[kind][0] += 1
+        timings[kind][1] += duration
+
+
+# The start time is kept on the execution context, which is dropped with a failed
+# statement whose after_cursor_execute never fires
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, many):
+    context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_statement_timer(conn, cursor, statement, parameters, context, many):
+    record("sql", time.perf_counter() - context._metrics_start)
+
+
+def _endpoint() -> str:
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def _start_request() -> None:
+    g.timings = {"start": time.perf_counter(), "sql": [0, 0.0], "redis": [0, 0.0]}
+
+
+def _finish_request(response: Response) -> Response:
+    timings = g.pop("timings", None)
+
+    if timings is None:
+        return response
+
+    duration = time.perf_counter() - timings["start"]
+    endpoint = _endpoint()
+
+    REQUEST_LATENCY.labels(request.method, endpoint, response.status_code).observe(
+        duration
+    )
+    SQL_STATEMENTS.labels(endpoint).inc(timings["sql"][0])
+    SQL_DURATION.labels(endpoint).observe(timings["sql"][1])
+    REDIS_CALLS.labels(endpoint).inc(timings["redis"][0])
+
+    # Streamed responses have no known length
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(request.method, endpoint).observe(response.content_length)
+
+    server_timing = current_app.config["SERVER_TIMING_ENABLED"]
+
+    if server_timing or (server_timing is None and current_app.debug):
+        response.headers["Server-Timing"] = (
+            'app;dur={:.1f}, sql;dur={:.1f};desc="{} queries", '
+            'redis;dur={:.1f};desc="{} calls"'.format(
+                duration * 1000,
+                timings["sql"][1] * 1000,
+                timings["sql"][0],
+                timings["redis"][1] * 1000,
+                timings["redis"][0],
+            )
+        )
+
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    """
+    Helper function to record the metrics of every request of the app and to add the
+    Server-Timing header when SERVER_TIMING_ENABLED is set, or left unset in debug mode
+
+    Parameters
+    ----------
+    app : Flask
+        The app to instrument
+    """
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def metrics_response() -> Response:
+    """
+    Helper function which renders the metrics in the Prometheus text format, the
+    metrics of all worker processes when PROMETHEUS_MULTIPROC_DIR is set
+
+    Returns
+    -------
+    Response
+        The metrics
+    """
+    registry = REGISTRY
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,168 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Helper function to turn the sort key of the last row of a page into an opaque cursor
+
+    Parameters
+    ----------
+    values : list
+        The values of the sort columns of the last row
+
+    Returns
+    -------
+    str
+        An URL safe cursor
+    """
+    payload = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ]
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: tuple) -> list:
+    """
+    Helper function to turn an opaque cursor back into the values of the sort columns
+
+    Parameters
+    ----------
+    cursor : str
+        The cursor as returned by `encode_cursor`
+    columns : tuple
+        The sort columns the cursor was created for
+
+    Returns
+    -------
+    list
+        The values of the sort columns
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+
+        return [
+            datetime.fromisoformat(value)
+            if column.type.python_type is datetime
+            else column.type.python_type(value)
+            for column, value in zip(columns, values)
+        ]
+
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def keyset(query, *columns) -> tuple[object, int]:
+    """
+    Helper function which narrows a query or select statement down to one page.
+    Rows are ordered newest first on `columns` and start after the `cursor` request
+    argument. Because the position is expressed as a WHERE clause on the (indexed)
+    sort columns rather than an OFFSET, every page costs the same. One row more than
+    the `limit` request argument is selected to tell whether a next page exists
+
+    Parameters
+    ----------
+    query : Query | Select
+        The query or select statement to paginate
+    columns : Column
+        The sort columns, the last one must be unique (usually the primary key)
+
+    Returns
+    -------
+    tuple[object, int]
+        The narrowed query or statement and the page size
+
+    Raises
+    ------
+    ValueError
+        If the cursor or the limit in the request arguments are invalid
+    """
+    limit = request.args.get(
+        "limit", current_app.config["PAGINATION_DEFAULT_LIMIT"], type=int
+    )
+
+    if not 1 <= limit <= current_app.config["PAGINATION_MAX_LIMIT"]:
+        raise ValueError(
+            "Limit must be between 1 and {}".format(
+                current_app.config["PAGINATION_MAX_LIMIT"]
+            )
+        )
+
+    cursor = request.args.get("cursor")
+
+    if cursor:
+        query = query.filter(tuple_(*columns) < tuple(decode_cursor(cursor, columns)))
+
+    query = query.order_by(*(column.desc() for column in columns)).limit(limit + 1)
+
+    return query, limit
+
+
+def split_page(rows: list, limit: int, *columns) -> tuple[list, str | None]:
+    """
+    Helper function which cuts the rows selected by a `keyset` query into the page and
+    the cursor of the next page
+
+    Parameters
+    ----------
+    rows : list
+        The rows selected by the query
+    limit : int
+        The page size
+    columns : Column
+        The sort columns
+
+    Returns
+    -------
+    tuple[list, str | None]
+        The rows of the page and the cursor of the next page, None on the last page
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
+
+
+def paginate(query, *columns) -> tuple[list, str | None]:
+    """
+    Helper function which applies keyset pagination to a query, see `keyset`
+
+    Parameters
+    ----------
+    query : Query
+        The query to paginate
+    columns : Column
+        The sort columns, the last one must be unique (usually the primary key)
+
+    Returns
+    -------
+    tuple[list, str | None]
+        The rows of the page and the cursor of the next page, None on the last page
+
+    Raises
+    ------
+    ValueError
+        If the cursor or the limit in the request arguments are invalid
+    """
+    query, limit = keyset(query, *columns)
+    return split_page(query.all(), limit, *columns)
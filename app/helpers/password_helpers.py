@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """
+    Raised when the password hasher already has the maximum number of pending jobs
+    """
+
+
+class PasswordHasher:
+    """
+    Password hashing in a bounded pool of worker processes, so a burst of logins or
+    registrations can not keep the request threads busy with key derivation. At most
+    `max_pending` jobs are queued or running per worker process, further requests are
+    rejected with `HasherBusy` instead of piling up. The pool is started on first use
+    and restarted in a forked child or when one of its processes died. Its processes
+    are started by a fork server (spawned where there is none), never forked from the
+    threaded worker process
+
+    Parameters
+    ----------
+    method : str
+        The Werkzeug hashing method, e.g. "scrypt" or "pbkdf2:sha256:600000"
+    max_workers : int | None
+        The number of hashing processes, None for one per CPU and 0 to hash in the
+        calling thread
+    max_pending : int
+        The maximum number of queued or running hashing jobs
+    """
+
+    def __init__(
+        self,
+        method: str = "pbkdf2:sha256:600000",
+        max_workers: int | None = None,
+        max_pending: int = 32,
+    ):
+        self.method = method
+        self._method_prefix = None
+        self.max_workers = max_workers
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """
+        The process pool of this worker process, started when needed
+        """
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    start_method = (
+                        "forkserver"
+                        if "forkserver" in multiprocessing.get_all_start_methods()
+                        else "spawn"
+                    )
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(start_method),
+                    )
+                    self._pid = os.getpid()
+
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """
+        Drop a broken pool so the next job starts a new one
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+        pool.shutdown(wait=False)
+
+    @property
+    def method_prefix(self) -> str:
+        """
+        The method as Werkzeug writes it in front of the hashes, with the defaults of
+        short names such as "scrypt" or "pbkdf2" filled in. It is taken from a hash of
+        an empty password made once per worker process
+        """
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash("", self.method).split("$")[0]
+
+        return self._method_prefix
+
+    def _run(self, func, *args):
+        if self.max_workers == 0:
+            return func(*args)
+
+        if not self._pending.acquire(blocking=False):
+            raise HasherBusy("Too many pending password hashing jobs")
+
+        try:
+            for attempt in range(2):
+                pool = self.pool
+
+                try:
+                    return pool.submit(func, *args).result()
+
+                # A hashing process died, e.g. killed for running out of memory. The
+                # job is retried once on a new pool
+                except BrokenProcessPool:
+                    self._discard_pool(pool)
+
+                    if attempt:
+                        raise
+        finally:
+            self._pending.release()
+
+    def hash(self, password: str) -> str:
+        """
+        Generate the hash of a password with the configured method
+
+        Parameters
+        ----------
+        password : str
+            The password to hash
+
+        Returns
+        -------
+        str
+            The password hash
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """
+        Check a password against a stored hash
+
+        Parameters
+        ----------
+        pwhash : str
+            The stored password hash
+        password : str
+            The password to check
+
+        Returns
+        -------
+        bool
+            True if the password matches the hash
+        """
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """
+        Check whether a stored hash was generated with other parameters than the
+        configured method
+
+        Parameters
+        ----------
+        pwhash : str
+            The stored password hash
+
+        Returns
+        -------
+        bool
+            True if the hash should be regenerated
+        """
+        return pwhash.split("$", 1)[0] != self.method_prefix
+
+    def close(self) -> None:
+        """
+        Shut down the process pool, for instance when the worker shuts down
+        """
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown()
+            self._pool = None
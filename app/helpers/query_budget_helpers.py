@@ -0,0 +1,103 @@
+from collections import Counter
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised in "raise" mode when a request runs more queries than the budget of its
+    route or repeats a statement like an N+1 loop
+    """
+
+
+def query_budget(max_queries: int):
+    """
+    Decorator declaring the maximum number of SQL statements a route may execute per
+    request, including the ones of the authentication. Checked when QUERY_BUDGET_MODE
+    is "warn" or "raise"
+
+    Parameters
+    ----------
+    max_queries : int
+        The maximum number of statements
+
+    Returns
+    -------
+    function
+        A decorator which marks the view function
+    """
+
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, many):
+    if has_app_context():
+        statements = g.get("statements")
+
+        if statements is not None:
+            statements.append(statement)
+
+
+def _start_request() -> None:
+    g.statements = []
+
+
+def _check_request(response: Response) -> Response:
+    statements = g.pop("statements", None)
+    view = current_app.view_functions.get(request.endpoint)
+
+    if statements is None or view is None:
+        return response
+
+    problems = []
+    budget = getattr(view, "query_budget", None)
+
+    if budget is not None and len(statements) > budget:
+        problems.append(
+            "{} ran {} queries, its budget is {}".format(
+                request.endpoint, len(statements), budget
+            )
+        )
+
+    # Statements which only differ in their parameters share the same SQL text
+    threshold = current_app.config["QUERY_REPEAT_THRESHOLD"]
+
+    for statement, count in Counter(statements).items():
+        if count >= threshold:
+            problems.append(
+                "{} ran the same statement {} times, likely an N+1 query: {}".format(
+                    request.endpoint, count, " ".join(statement.split())
+                )
+            )
+
+    for problem in problems:
+        current_app.logger.warning(problem)
+
+    if problems and current_app.config["QUERY_BUDGET_MODE"] == "raise":
+        raise QueryBudgetExceeded("\n".join(problems))
+
+    return response
+
+
+def init_query_budgets(app: Flask) -> None:
+    """
+    Helper function to count the SQL statements of every request of the app when
+    QUERY_BUDGET_MODE is "warn" or "raise"
+
+    Parameters
+    ----------
+    app : Flask
+        The app to check
+    """
+    if app.config["QUERY_BUDGET_MODE"] not in ("warn", "raise"):
+        return
+
+    app.before_request(_start_request)
+    app.after_request(_check_request)
@@ -0,0 +1,105 @@
+import threading
+import time
+from functools import partial
+
+from limits import RateLimitItem
+from limits.storage import StorageTypes
+from limits.strategies import STRATEGIES, MovingWindowRateLimiter
+
+# Name of the prefetching strategy for RATELIMIT_STRATEGY
+PREFETCH_STRATEGY = "moving-window-prefetch"
+
+
+class PrefetchingRateLimiter(MovingWindowRateLimiter):
+    """
+    Moving window rate limiting which reserves quota in batches. A hit which finds no
+    reserved tokens left acquires `batch_size` entries of the shared moving window in
+    one storage round trip, the following hits for the same limit are served from the
+    local bucket until it is empty or the reserved entries leave the window. When a
+    full batch no longer fits in the window only the hit itself is acquired.
+
+    The limit is not enforced exactly. Reserved tokens are spent after the window
+    recorded them, so tokens reserved just before a window can still be spent inside
+    it: any window of the limit's length admits up to the limit plus
+    `batch_size - 1` hits per worker process. To keep that overshoot small, batches
+    are capped to a tenth of the limit, so small limits are not prefetched at all.
+    Quota reserved by one worker is not available to the others until it expires
+
+    Parameters
+    ----------
+    storage : StorageTypes
+        The storage of the limiter
+    batch_size : int
+        The number of hits reserved per storage round trip
+    """
+
+    # Number of buckets above which expired buckets are dropped
+    max_buckets = 1024
+
+    # Largest share of a limit reserved by one batch
+    max_batch_share = 0.1
+
+    def __init__(self, storage: StorageTypes, batch_size: int = 10):
+        super().__init__(storage)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def hit(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        key = item.key_for(*identifiers)
+        now = time.time()
+
+        with self._lock:
+            tokens, expires = self._buckets.get(key, (0, 0.0))
+
+            if expires > now and tokens >= cost:
+                self._buckets[key] = (tokens - cost, expires)
+                return True
+
+        batch = max(min(self.batch_size, int(item.amount * self.max_batch_share)), cost)
+
+        if batch > cost and super().hit(item, *identifiers, cost=batch):
+            reserved = batch - cost
+        elif super().hit(item, *identifiers, cost=cost):
+            reserved = 0
+        else:
+            return False
+
+        with self._lock:
+            if len(self._buckets) >= self.max_buckets:
+                self._buckets = {
+                    k: bucket for k, bucket in self._buckets.items() if bucket[1] > now
+                }
+
+            self._buckets[key] = (reserved, now + item.get_expiry())
+
+        return True
+
+    def test(self, item: RateLimitItem, *identifiers: str) -> bool:
+        tokens, expires = self._buckets.get(item.key_for(*identifiers), (0, 0.0))
+
+        if expires > time.time() and tokens > 0:
+            return True
+
+        return super().test(item, *identifiers)
+
+    def clear(self, item: RateLimitItem, *identifiers: str) -> None:
+        with self._lock:
+            self._buckets.pop(item.key_for(*identifiers), None)
+
+        super().clear(item, *identifiers)
+
+
+def register_prefetch_strategy(batch_size: int) -> None:
+    """
+    Helper function to make the prefetching strategy available to Flask-Limiter as
+    "moving-window-prefetch"
+
+    Parameters
+    ----------
+    batch_size : int
+        The number of hits reserved per storage round trip
+    """
+    STRATEGIES[PREFETCH_STRATEGY] = partial(
+        PrefetchingRateLimiter, batch_size=batch_size
+    )
@@ -0,0 +1,166 @@
+import random
+from functools import wraps
+
+import redis
+from flask import current_app, g, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+
+# Prefix of the SQLALCHEMY_BINDS keys which are read replicas of the primary database
+REPLICA_BIND_PREFIX = "replica"
+
+
+class RoutingSession(Session):
+    """
+    Session which sends the SELECT statements of read only views to the replica bind
+    chosen for the request. Writes, flushes and every other request use the primary
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and isinstance(clause, Select)
+            and not self._flushing
+            and has_app_context()
+            and g.get("read_bind") is not None
+        ):
+            return self._db.engines[g.read_bind]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Chooses the database bind of read only requests. Reads go to a random replica,
+    unless the user wrote to the primary within the last `pin_seconds`: such reads are
+    pinned to the primary so users always see their own writes despite replication
+    lag. The recent write markers live in Redis so they hold across workers, when
+    Redis is unavailable reads use the primary
+
+    Parameters
+    ----------
+    connection : redis.Redis
+        The Redis connection of the app
+    binds : list
+        The bind keys of the replicas
+    pin_seconds : int
+        The number of seconds reads of a user are pinned to the primary after a write
+    """
+
+    key_prefix = "recent-write:"
+
+    def __init__(self, connection: redis.Redis, binds: list, pin_seconds: int = 5):
+        self.redis = connection
+        self.binds = binds
+        self.pin_seconds = pin_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.binds)
+
+    def mark_write(self, user_id) -> None:
+        """
+        Pin the reads of a user to the primary for `pin_seconds`
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user who wrote
+        """
+        if not self.enabled:
+            return
+
+        try:
+            self.redis.set(
+                self.key_prefix + str(user_id), 1, ex=max(self.pin_seconds, 1)
+            )
+        except redis.exceptions.RedisError:
+            current_app.logger.warning("Could not mark a recent write in Redis")
+
+    def choose(self, user_id) -> str | None:
+        """
+        Choose the bind for a read of a user
+
+        Parameters
+        ----------
+        user_id : int | None
+            The ID of the user reading, None for anonymous reads
+
+        Returns
+        -------
+        str | None
+            The bind key of a replica, None for the primary
+        """
+        if not self.enabled:
+            return None
+
+        if user_id is not None:
+            try:
+                if self.redis.exists(self.key_prefix + str(user_id)):
+                    return None
+            except redis.exceptions.RedisError:
+                return None
+
+        return random.choice(self.binds)
+
+
+def replica_binds(config: dict) -> list:
+    """
+    Helper function which lists the replica bind keys of the config
+
+    Parameters
+    ----------
+    config : dict
+        The config of the app
+
+    Returns
+    -------
+    list
+        The bind keys of SQLALCHEMY_BINDS starting with "replica"
+    """
+    return sorted(
+        key
+        for key in config.get("SQLALCHEMY_BINDS") or {}
+        if key.startswith(REPLICA_BIND_PREFIX)
+    )
+
+
+def current_identity():
+    """
+    Helper function returning the JWT identity of the current request, None without a
+    request or a verified JWT
+    """
+    if not has_request_context():
+        return None
+
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def read_only(view):
+    """
+    Decorator for views which only read, their queries are sent to a replica unless
+    the user recently wrote. Apply it below `jwt_required` so the user is known. The
+    bind is chosen before an async view is handed to the event loop, so the Redis
+    lookup never blocks the loop
+
+    Parameters
+    ----------
+    view : function
+        The view function, sync or async
+
+    Returns
+    -------
+    function
+        The wrapped view function
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_bind = current_app.replica_router.choose(current_identity())
+        return current_app.ensure_sync(view)(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,414 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import redis
+from flask import current_app
+
+from app import db
+
+# Redis key with the ID of the pending run of the periodic token removal
+REMOVAL_JOB_KEY = "remove-old-jwts:job"
+
+
+class BloomFilter:
+    """
+    A minimal in-process Bloom filter used as a fast negative check for revoked JWTs
+
+    Parameters
+    ----------
+    capacity : int
+        The number of items the filter is sized for
+    error_rate : float
+        The desired false positive rate once the filter holds `capacity` items
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(
+            int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8
+        )
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        """
+        Add an item to the filter
+
+        Parameters
+        ----------
+        item : str
+            The item to add
+        """
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    @property
+    def saturated(self) -> bool:
+        return self.count >= self.capacity
+
+
+class RevokedTokenStore:
+    """
+    Revocation store for JWTs which keeps revoked JTIs in Redis with a TTL equal to
+    the token's own expiry. An in-process Bloom filter sits in front of Redis so the
+    common "not revoked" answer costs no network round trip. The revoked token SQL
+    table is kept as the durable source the filter and Redis are backfilled from.
+
+    Revocations made by other workers are picked up from a Redis stream at most
+    every `sync_interval` seconds. When Redis is unavailable every check falls back
+    to the SQL table.
+
+    Parameters
+    ----------
+    connection : redis.Redis
+        The Redis connection of the app
+    capacity : int
+        The number of revoked tokens the Bloom filter is sized for
+    error_rate : float
+        The false positive rate of the Bloom filter
+    sync_interval : float
+        The maximum number of seconds between two syncs with the revocation stream
+    """
+
+    key_prefix = "revoked-token:"
+    stream_key = "revoked-tokens"
+
+    def __init__(
+        self,
+        connection: redis.Redis,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+        sync_interval: float = 1.0,
+    ):
+        self.redis = connection
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_stream_id = None
+        self._last_sync = 0.0
+        self._synced = False
+
+    def revoke(self, jti: str, expires: datetime) -> None:
+        """
+        Revoke a JWT by writing it to the SQL table, Redis and the local filter
+
+        Parameters
+        ----------
+        jti : str
+            The JWT unique identifier
+        expires : datetime
+            The (UTC) moment the JWT expires
+        """
+        from app.models import RevokedTokenModel
+
+        RevokedTokenModel(jti=jti, expires=expires).add()
+
+        try:
+            pipe = self.redis.pipeline()
+            self._set_key(pipe, jti, expires)
+            pipe.xadd(
+                self.stream_key,
+                {"jti": jti},
+                maxlen=self.capacity,
+                approximate=True,
+            )
+            pipe.execute()
+
+        except redis.exceptions.RedisError:
+            current_app.logger.warning("Could not write revoked token to Redis")
+
+        with self._lock:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        Check whether a JWT has been revoked
+
+        Parameters
+        ----------
+        jti : str
+            The JWT unique identifier
+
+        Returns
+        -------
+        bool
+            Returns True if the JWT has been revoked
+        """
+        if not self._sync():
+            return self._is_revoked_in_database(jti)
+
+        if jti not in self._bloom:
+            return False
+
+        try:
+            if self.redis.exists(self.key_prefix + jti):
+                return True
+
+        except redis.exceptions.RedisError:
+            pass
+
+        # Either a false positive or Redis lost the key, the database decides
+        return self._is_revoked_in_database(jti)
+
+    def _is_revoked_in_database(self, jti: str) -> bool:
+        from app.models import RevokedTokenModel
+
+        token = RevokedTokenModel.query.filter_by(jti=jti).first()
+
+        if token is None:
+            return False
+
+        if token.expires is not None:
+            try:
+                self._set_key(self.redis, jti, token.expires)
+
+            except redis.exceptions.RedisError:
+                pass
+
+        return True
+
+    def _set_key(self, connection, jti: str, expires: datetime) -> None:
+        ttl = max(int((expires - datetime.utcnow()).total_seconds()), 1)
+        connection.set(self.key_prefix + jti, 1, ex=ttl)
+
+    def _sync(self) -> bool:
+        """
+        Pull revocations made by other workers into the local filter, at most once
+        every `sync_interval` seconds
+
+        Returns
+        -------
+        bool
+            Returns True if the local filter can be trusted for negative answers
+        """
+        now = time.monotonic()
+
+        if self._synced and now - self._last_sync < self.sync_interval:
+            return True
+
+        with self._lock:
+            if self._synced and now - self._last_sync < self.sync_interval:
+                return True
+
+            try:
+                if not self._synced or self._bloom.saturated:
+                    self._backfill()
+
+                else:
+                    self._read_stream()
+
+            except redis.exceptions.RedisError:
+                self._synced = False
+                return False
+
+            self._last_sync = now
+            self._synced = True
+
+        return True
+
+    def _read_stream(self) -> None:
+        response = self.redis.xread({self.stream_key: self._last_stream_id})
+
+        for _, entries in response:
+            for entry_id, fields in entries:
+                self._bloom.add(fields[b"jti"].decode())
+                self._last_stream_id = entry_id
+
+    def _backfill(self) -> None:
+        """
+        Rebuild the local filter (and the Redis keys) from the unexpired rows of the
+        revoked token table
+        """
+        from app.models import RevokedTokenModel
+
+        # Remember the stream position first so nothing revoked during the backfill
+        # is missed by the next stream read
+        latest = self.redis.xrevrange(self.stream_key, count=1)
+        self._last_stream_id = latest[0][0] if latest else b"0-0"
+
+        now = datetime.utcnow()
+        tokens = db.session.execute(
+            db.select(RevokedTokenModel.jti, RevokedTokenModel.expires).where(
+                db.or_(
+                    RevokedTokenModel.expires.is_(None),
+                    RevokedTokenModel.expires > now,
+                )
+            )
+        ).all()
+
+        # Leave headroom so the filter is not saturated again straight away
+        bloom = BloomFilter(max(self.capacity, 2 * len(tokens)), self.error_rate)
+        pipe = self.redis.pipeline(transaction=False)
+
+        for jti, expires in tokens:
+            bloom.add(jti)
+
+            if expires is not None:
+                self._set_key(pipe, jti, expires)
+
+        pipe.execute()
+        self._bloom = bloom
+
+
+def remove_old_tokens(
+    days: int,
+    chunk_size: int = 1000,
+    include_expired: bool = False,
+    dry_run: bool = False,
+    progress=None,
+) -> int:
+    """
+    Helper function which deletes revoked tokens older than the retention window from
+    the revoked token table in chunked, set based DELETE statements
+
+    Parameters
+    ----------
+    days : int
+        The retention window, tokens revoked longer than this many days ago are removed
+    chunk_size : int, optional
+        The number of rows deleted (and committed) per statement, by default 1000
+    include_expired : bool, optional
+        Also remove tokens which expired already, whatever their age, by default False
+    dry_run : bool, optional
+        Only count the tokens which would be removed, by default False
+    progress : callable, optional
+        Called with the running total after every chunk
+
+    Returns
+    -------
+    int
+        The number of tokens removed, or that would be removed on a dry run
+    """
+    from app.models import RevokedTokenModel
+
+    now = datetime.utcnow()
+    condition = RevokedTokenModel.date_revoked < now - timedelta(days=days)
+
+    if include_expired:
+        condition = db.or_(condition, RevokedTokenModel.expires < now)
+
+    if dry_run:
+        return db.session.scalar(
+            db.select(db.func.count(RevokedTokenModel.id)).where(condition)
+        )
+
+    total = 0
+
+    while True:
+        ids = db.session.scalars(
+            db.select(RevokedTokenModel.id).where(condition).limit(chunk_size)
+        ).all()
+
+        if not ids:
+            break
+
+        db.session.execute(
+            db.delete(RevokedTokenModel).where(RevokedTokenModel.id.in_(ids)),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+
+        total += len(ids)
+
+        if progress is not None:
+            progress(total)
+
+        if len(ids) < chunk_size:
+            break
+
+    return total
+
+
+def _removal_pending(job_id: str | None) -> bool:
+    job = current_app.task_queue.fetch_job(job_id) if job_id else None
+
+    return job is not None and job.get_status() in (
+        "scheduled",
+        "queued",
+        "deferred",
+        "started",
+    )
+
+
+def schedule_token_removal(after: str | None = None, **kwargs) -> str | None:
+    """
+    Helper function which schedules a run of the periodic token removal in
+    JWT_REVOCATION_PURGE_INTERVAL seconds. Only one chain of runs exists: a chain is
+    not started while a run is pending, and a run only schedules the next one while
+    it is the current run of the chain, so `unschedule_token_removal` stops it
+
+    Parameters
+    ----------
+    after : str | None, optional
+        The job ID of the run scheduling its successor, None to start a chain
+    kwargs
+        The arguments of `remove_old_tokens` passed to the runs
+
+    Returns
+    -------
+    str | None
+        The job ID of the scheduled run, None if nothing was scheduled
+    """
+    current = current_app.redis.get(REMOVAL_JOB_KEY)
+    current = current.decode() if current is not None else None
+
+    if after is None and _removal_pending(current):
+        return None
+
+    if after is not None and current != after:
+        return None
+
+    job = current_app.task_queue.enqueue_in(
+        timedelta(seconds=current_app.config["JWT_REVOCATION_PURGE_INTERVAL"]),
+        "app.tasks.long_running_jobs.remove_old_jwts",
+        **kwargs,
+    )
+    current_app.redis.set(REMOVAL_JOB_KEY, job.get_id())
+
+    return job.get_id()
+
+
+def unschedule_token_removal() -> bool:
+    """
+    Helper function which stops the periodic token removal. A pending run is deleted,
+    a running one finishes without scheduling the next
+
+    Returns
+    -------
+    bool
+        Returns True if the removal was scheduled
+    """
+    current = current_app.redis.get(REMOVAL_JOB_KEY)
+    current_app.redis.delete(REMOVAL_JOB_KEY)
+
+    if current is None:
+        return False
+
+    job = current_app.task_queue.fetch_job(current.decode())
+
+    if job is not None and job.get_status() != "started":
+        job.delete()
+
+    return True
@@ -0,0 +1,161 @@
+import re
+
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    case,
+    column,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+    text,
+    type_coerce,
+    union_all,
+)
+
+from app import db
+from app.models import SEARCH_DOCUMENTS, Comments, Posts, search_index_statements
+
+# Terms of a search beyond this number are ignored
+MAX_SEARCH_TERMS = 16
+
+search_index = table("search_index", column("rowid", Integer), column("body", String))
+
+
+def search_terms(q: str) -> list:
+    """
+    Helper function which splits a search into its words, dropping any operator
+    syntax of the full-text engines
+
+    Parameters
+    ----------
+    q : str
+        The search as entered by the user
+
+    Returns
+    -------
+    list
+        The words to search for
+    """
+    return re.findall(r"\w+", q)[:MAX_SEARCH_TERMS]
+
+
+def search_statement(terms: list, dialect: str):
+    """
+    Helper function which builds the ranked full-text search over posts and comments.
+    Documents must contain every term, the rows have a `type`, `id`, `body`, `score`
+    (higher is better) and a unique `key` so they can be paginated with `keyset`
+
+    Parameters
+    ----------
+    terms : list
+        The words to search for
+    dialect : str
+        The name of the database dialect
+
+    Returns
+    -------
+    tuple
+        The search statement followed by its sort columns for `keyset`
+
+    Raises
+    ------
+    NotImplementedError
+        If the database has no supported full-text index
+    """
+    if dialect == "sqlite":
+        match = " ".join('"{}"'.format(term) for term in terms)
+        rowid = search_index.c.rowid
+        results = (
+            select(
+                case(
+                    (rowid % 2 == SEARCH_DOCUMENTS["posts"], "post"), else_="comment"
+                ).label("type"),
+                (rowid // 2).label("id"),
+                search_index.c.body,
+                type_coerce(-func.bm25(literal_column("search_index")), Float).label(
+                    "score"
+                ),
+                rowid.label("key"),
+            )
+            .where(literal_column("search_index").op("MATCH")(match))
+            .subquery()
+        )
+
+    elif dialect == "postgresql":
+        query = func.plainto_tsquery("english", " ".join(terms))
+        results = union_all(
+            *(
+                select(
+                    literal(kind).label("type"),
+                    model.id.label("id"),
+                    model.body,
+                    type_coerce(
+                        func.ts_rank(literal_column("search_vector"), query), Float
+                    ).label("score"),
+                    (model.id * 2 + SEARCH_DOCUMENTS[model.__tablename__]).label("key"),
+                ).where(literal_column("search_vector").op("@@")(query))
+                for kind, model in (("post", Posts), ("comment", Comments))
+            )
+        ).subquery()
+
+    else:
+        raise NotImplementedError(
+            "Search needs SQLite with FTS5 or PostgreSQL, not {}".format(dialect)
+        )
+
+    return select(results), results.c.score, results.c.key
+
+
+def reindex() -> int:
+    """
+    Helper function which rebuilds the full-text index from the posts and comments
+    tables, the index is created first when it is missing
+
+    Returns
+    -------
+    int
+        The number of indexed documents
+    """
+    dialect = db.engine.dialect.name
+
+    for statement in search_index_statements(dialect):
+        db.session.execute(text(statement))
+
+    if dialect == "sqlite":
+        db.session.execute(text("DELETE FROM search_index"))
+
+        for model in (Posts, Comments):
+            db.session.execute(
+                text(
+                    "INSERT INTO search_index(rowid, body) "
+                    "SELECT id * 2 + :kind, body FROM {}".format(model.__tablename__)
+                ),
+                {"kind": SEARCH_DOCUMENTS[model.__tablename__]},
+            )
+
+        db.session.execute(
+            text("INSERT INTO search_index(search_index) VALUES ('optimize')")
+        )
+
+    elif dialect == "postgresql":
+        # The generated tsvector columns are always current, only the GIN indexes
+        # are rebuilt
+        for model in (Posts, Comments):
+            db.session.execute(
+                text("REINDEX INDEX ix_{}_search_vector".format(model.__tablename__))
+            )
+
+    else:
+        raise NotImplementedError(
+            "Search needs SQLite with FTS5 or PostgreSQL, not {}".format(dialect)
+        )
+
+    db.session.commit()
+
+    return db.session.scalar(select(func.count(Posts.id))) + db.session.scalar(
+        select(func.count(Comments.id))
+    )
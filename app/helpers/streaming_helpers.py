@@ -0,0 +1,70 @@
+from itertools import islice
+
+from flask import Response, current_app, request, stream_with_context
+
+STREAM_FORMATS = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def stream(query, schema, *columns) -> Response:
+    """
+    Helper function which streams every row of a query as a JSON array or as newline
+    delimited JSON, depending on the `stream` request argument. Rows are fetched in
+    chunks through `yield_per` (a server-side cursor where the driver supports one)
+    and serialized chunk by chunk, so memory stays flat and the first byte is sent
+    before the whole result has been read
+
+    Parameters
+    ----------
+    query : Query
+        The query to stream
+    schema : Schema
+        The marshmallow schema used to serialize the rows
+    columns : Column
+        The sort columns, rows are streamed newest first
+
+    Returns
+    -------
+    Response
+        A streamed response
+
+    Raises
+    ------
+    ValueError
+        If the requested stream format is unknown
+    """
+    stream_format = request.args.get("stream")
+
+    if stream_format not in STREAM_FORMATS:
+        raise ValueError(
+            "Stream format must be one of: {}".format(", ".join(STREAM_FORMATS))
+        )
+
+    chunk_size = current_app.config["STREAMING_CHUNK_SIZE"]
+    rows = iter(
+        query.order_by(*(column.desc() for column in columns)).yield_per(chunk_size)
+    )
+    dumps = current_app.json.dumps
+
+    def generate():
+        first = True
+
+        if stream_format == "json":
+            yield "["
+
+        while chunk := list(islice(rows, chunk_size)):
+            items = (dumps(item) for item in schema.dump(chunk, many=True))
+
+            if stream_format == "ndjson":
+                yield "".join(item + "\n" for item in items)
+                continue
+
+            body = ",".join(items)
+            yield body if first else "," + body
+            first = False
+
+        if stream_format == "json":
+            yield "]"
+
+    return Response(
+        stream_with_context(generate()), mimetype=STREAM_FORMATS[stream_format]
+    )
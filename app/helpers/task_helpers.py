@@ -1,25 +1,216 @@
+import json
+import time
+
+import redis
+from flask import current_app
 from rq import get_current_job
 
 from app import db
 from app.models import Tasks
 
 
+def progress_channel(user_id: int) -> str:
+    """
+    Helper function which returns the Redis pub/sub channel with a user's task progress
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user
+
+    Returns
+    -------
+    str
+        The name of the channel
+    """
+    return "task-progress:{}".format(user_id)
+
+
+def progress_sequence_key(user_id: int) -> str:
+    """
+    Helper function which returns the Redis key counting a user's progress events
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user
+
+    Returns
+    -------
+    str
+        The name of the key
+    """
+    return "task-progress-sequence:{}".format(user_id)
+
+
+def progress_latest_key(user_id: int) -> str:
+    """
+    Helper function which returns the Redis hash with the latest progress event of each
+    of a user's tasks
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user
+
+    Returns
+    -------
+    str
+        The name of the key
+    """
+    return "task-progress-latest:{}".format(user_id)
+
+
+def publish_task_progress(user_id: int, task_id: str, progress: int) -> None:
+    """
+    A helper function which publishes a progress update of a background task to the
+    subscribers of the user's progress channel. Every event is numbered and the latest
+    one of each task is kept, so clients can be sent what they missed when they
+    reconnect
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user who launched the task
+    task_id : str
+        The RQ job ID of the task
+    progress : int
+        The percentage of the task progress
+    """
+    try:
+        event_id = current_app.redis.incr(progress_sequence_key(user_id))
+        pipeline = current_app.redis.pipeline(transaction=False)
+        pipeline.hset(
+            progress_latest_key(user_id),
+            task_id,
+            json.dumps({"id": event_id, "progress": progress}),
+        )
+        pipeline.expire(
+            progress_latest_key(user_id),
+            current_app.config["TASK_PROGRESS_REPLAY_TTL"],
+        )
+        pipeline.publish(
+            progress_channel(user_id),
+            json.dumps({"id": event_id, "task_id": task_id, "progress": progress}),
+        )
+        pipeline.execute()
+
+    except redis.exceptions.RedisError:
+        current_app.logger.warning("Could not publish task progress")
+
+
+class ProgressReporter:
+    """
+    Reports the progress of the current background task while coalescing updates.
+    A new value is only written to Redis (and published) once it moved at least
+    `min_delta` percent or `min_interval` seconds passed since the last write, and
+    the SQL database is only touched once, when the task completes. Used as a
+    context manager the reporter always flushes and completes the task on exit,
+    also when the job fails
+
+    Parameters
+    ----------
+    min_delta : int, optional
+        The minimum change in percent before an update is written, defaults to
+        TASK_PROGRESS_MIN_DELTA
+    min_interval : float, optional
+        The number of seconds after which any change is written, defaults to
+        TASK_PROGRESS_MIN_INTERVAL
+    """
+
+    def __init__(self, min_delta: int | None = None, min_interval: float | None = None):
+        self.job = get_current_job()
+        self.min_delta = (
+            min_delta
+            if min_delta is not None
+            else current_app.config["TASK_PROGRESS_MIN_DELTA"]
+        )
+        self.min_interval = (
+            min_interval
+            if min_interval is not None
+            else current_app.config["TASK_PROGRESS_MIN_INTERVAL"]
+        )
+        self.progress = None
+        self._written = None
+        self._written_at = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.complete()
+        return False
+
+    def update(self, progress: int) -> None:
+        """
+        Record the progress of the task, writing it when it is due
+
+        Parameters
+        ----------
+        progress : int
+            The percentage of the task progress
+        """
+        self.progress = progress
+
+        if self._written is None or progress >= 100:
+            self.flush()
+
+        elif progress != self._written and (
+            abs(progress - self._written) >= self.min_delta
+            or time.monotonic() - self._written_at >= self.min_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the latest recorded progress if it was not written yet
+        """
+        if self.job is None or self.progress is None or self.progress == self._written:
+            return
+
+        self.job.meta["progress"] = self.progress
+
+        try:
+            self.job.save_meta()
+
+        except redis.exceptions.RedisError:
+            current_app.logger.warning("Could not save task progress")
+            return
+
+        if self.job.meta.get("user_id") is not None:
+            publish_task_progress(
+                self.job.meta["user_id"], self.job.get_id(), self.progress
+            )
+
+        self._written = self.progress
+        self._written_at = time.monotonic()
+
+    def complete(self) -> None:
+        """
+        Write 100 percent progress and mark the task as complete in the database
+        """
+        self.progress = 100
+        self.flush()
+
+        if self.job is not None:
+            Tasks.query.filter_by(task_id=self.job.get_id()).update({"complete": True})
+            db.session.commit()
+
+
 def _set_task_progress(progress: int) -> None:
     """
-    A helper function which updates the progress status of a background task
+    A helper function which updates the progress status of a background task right
+    away, prefer `ProgressReporter` for frequent updates
 
     Parameters
     ----------
     progress : int
         The percentage of the task progress
     """
-    job = get_current_job()
-    if job:
-        job.meta["progress"] = progress
-        job.save_meta()
+    reporter = ProgressReporter(min_delta=0, min_interval=0)
 
-        if progress >= 100:
-            task = Tasks.query.filter(task_id=job.get_id()).first()
-            task.complete = True
+    if progress >= 100:
+        reporter.complete()
 
-        db.session.commit()
+    else:
+        reporter.update(progress)
@@ -1,3 +1,16 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import event
+
+# Log directory of the test configs, so test runs do not write to the project's logs
+TEST_LOG_DIR = os.path.join(tempfile.gettempdir(), "flask_api_test_logs")
+
+
 def register_and_login_test_user(c) -> str:
     """
     Helper function that makes an HTTP request to register a test user
@@ -31,3 +44,102 @@ def register_and_login_test_user(c) -> str:
     setup_access_token = setup_resp_json["access_token"]
 
     return setup_access_token
+
+
+@contextmanager
+def capture_queries(engine) -> list:
+    """
+    Context manager which records every SELECT statement executed on an engine
+
+    Parameters
+    ----------
+    engine : Engine
+        The SQLAlchemy engine to listen on
+
+    Returns
+    -------
+    list
+        A list of (statement, parameters) tuples, filled while the context is active
+    """
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().upper().startswith("SELECT"):
+            queries.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def find_full_table_scans(engine, queries: list) -> list:
+    """
+    Helper function which runs EXPLAIN QUERY PLAN (SQLite) for each query and returns
+    the ones that scan a whole table instead of searching an index
+
+    Parameters
+    ----------
+    engine : Engine
+        The SQLite engine the queries were captured on
+    queries : list
+        A list of (statement, parameters) tuples as recorded by `capture_queries`
+
+    Returns
+    -------
+    list
+        A list of (statement, plan detail) tuples, one for every full table scan
+    """
+    scans = []
+
+    with engine.connect() as connection:
+        for statement, parameters in queries:
+            plan = connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            ).all()
+
+            for row in plan:
+                detail = row[-1]
+
+                if detail.startswith("SCAN "):
+                    scans.append((statement, detail))
+
+    return scans
+
+
+def start_stub_upstream(payload) -> tuple:
+    """
+    Helper function which starts a local HTTP server answering every GET request with
+    the same JSON payload, as a stand-in for an upstream API
+
+    Parameters
+    ----------
+    payload : object
+        The JSON serializable payload to return
+
+    Returns
+    -------
+    tuple
+        The server, its base URL and a list which receives the path of every request
+    """
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, "http://127.0.0.1:{}".format(server.server_port), requests
@@ -0,0 +1,284 @@
+from datetime import datetime, timedelta
+
+import redis
+from flask import current_app, request
+from sqlalchemy import select
+
+from app import db
+from app.helpers.pagination_helpers import (
+    decode_cursor,
+    encode_cursor,
+    keyset,
+    split_page,
+)
+from app.models import Posts
+
+# Scores are the post timestamps in whole microseconds since the epoch, which a
+# double represents exactly
+EPOCH = datetime(1970, 1, 1)
+
+# Merges posts (score and member pairs after the length and TTL) into a timeline and
+# trims it. Nothing is ever replaced, so a fill racing a push can not lose the post
+ADD_SCRIPT = """
+redis.call("ZADD", KEYS[1], unpack(ARGV, 3))
+redis.call("ZREMRANGEBYRANK", KEYS[1], 0, -tonumber(ARGV[1]) - 1)
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 0
+"""
+
+# Member with the lowest score which marks a timeline holding every post, trimming
+# removes it first. Only fills add it, timelines built by pushes alone are partial
+END = 0
+
+
+def _score(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def _timestamp(score: float) -> datetime:
+    return EPOCH + timedelta(microseconds=int(score))
+
+
+class Timeline:
+    """
+    Home timelines of the users, kept in Redis as sorted sets of post IDs scored by
+    the post timestamp. New posts are fanned out on write to the timeline of every
+    recipient, which is capped to the newest `max_length` posts, so reading a page is
+    a range read plus one batched query for the posts. Pages a timeline can not serve
+    are read from the database, a first page read that way fills the timeline. All
+    reads use the database when Redis is unavailable
+
+    Parameters
+    ----------
+    connection : redis.Redis
+        The Redis connection of the app
+    max_length : int
+        The maximum number of posts kept per timeline
+    ttl : int
+        The number of seconds a timeline is kept after its last change
+    """
+
+    key_prefix = "timeline:"
+
+    def __init__(
+        self, connection: redis.Redis, max_length: int = 800, ttl: int = 86400
+    ):
+        self.redis = connection
+        self.max_length = max_length
+        self.ttl = ttl
+        self._add = connection.register_script(ADD_SCRIPT)
+
+    def recipients(self, user_id: int) -> list:
+        """
+        The users whose timeline shows the posts of a user. Users can not follow each
+        other yet, so this is only the author
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the author
+
+        Returns
+        -------
+        list
+            The IDs of the users
+        """
+        return [user_id]
+
+    def push(self, user_id: int, post_id: int, timestamp: datetime) -> None:
+        """
+        Fan a new post out to the timelines of its recipients
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the author
+        post_id : int
+            The ID of the post
+        timestamp : datetime
+            The timestamp of the post
+        """
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+
+            for recipient in self.recipients(user_id):
+                self._add(
+                    keys=[self.key_prefix + str(recipient)],
+                    args=[self.max_length, self.ttl, _score(timestamp), post_id],
+                    client=pipeline,
+                )
+
+            pipeline.execute()
+        except redis.exceptions.RedisError:
+            current_app.logger.warning("Could not add a post to the timelines")
+
+    def remove(self, user_id: int, post_id: int) -> None:
+        """
+        Remove a deleted post from the timelines of its recipients
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the author
+        post_id : int
+            The ID of the post
+        """
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+
+            for recipient in self.recipients(user_id):
+                pipeline.zrem(self.key_prefix + str(recipient), post_id)
+
+            pipeline.execute()
+        except redis.exceptions.RedisError:
+            current_app.logger.warning("Could not remove a post from the timelines")
+
+    def read(self, user_id: int, limit: int, before: list | None) -> list | None:
+        """
+        Read up to `limit + 1` entries of a cached timeline, newest first
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user
+        limit : int
+            The page size
+        before : list | None
+            The timestamp and ID of the last post of the previous page
+
+        Returns
+        -------
+        list | None
+            The timestamps and IDs of the posts, None if the page has to be read from the
+            database
+
+        Raises
+        ------
+        redis.exceptions.RedisError
+            If Redis is unavailable
+        """
+        pipeline = self.redis.pipeline(transaction=False)
+        key = self.key_prefix + str(user_id)
+        pipeline.zcard(key)
+        pipeline.zrevrangebyscore(
+            key,
+            _score(before[0]) if before else "+inf",
+            "-inf",
+            start=0,
+            num=limit + 1,
+            withscores=True,
+        )
+        size, members = pipeline.execute()
+
+        if not size:
+            return None
+
+        entries = [(_timestamp(score), int(member)) for member, score in members]
+        complete = any(post_id == END for _, post_id in entries)
+        entries = [
+            entry
+            for entry in entries
+            if entry[1] != END and (not before or entry < tuple(before))
+        ]
+
+        # Short pages of a trimmed timeline, or pages cut short by posts which share
+        # the timestamp of the cursor, are left to the database
+        if len(entries) <= limit and not complete:
+            return None
+
+        return entries
+
+    def fill(self, user_id: int) -> None:
+        """
+        Merge the newest posts of a user from the database into the timeline. Posts
+        pushed meanwhile are kept, when the database has fewer than `max_length` posts
+        the timeline is marked complete
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user
+        """
+        rows = db.session.execute(
+            select(Posts.id, Posts.timestamp)
+            .where(Posts.user_id == user_id)
+            .order_by(Posts.timestamp.desc(), Posts.id.desc())
+            .limit(self.max_length)
+        ).all()
+
+        args = [self.max_length, self.ttl]
+
+        for row in rows:
+            args += [_score(row.timestamp), row.id]
+
+        if len(rows) < self.max_length:
+            args += [0, END]
+
+        try:
+            self._add(keys=[self.key_prefix + str(user_id)], args=args)
+        except redis.exceptions.RedisError:
+            current_app.logger.warning("Could not cache a timeline in Redis")
+
+
+def timeline_page(user_id: int, serializer) -> tuple[list, str | None]:
+    """
+    Helper function which reads a page of the home timeline of a user, newest first.
+    The `limit` and `cursor` request arguments select the page like `keyset`, cursors
+    are interchangeable between cached and database reads
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user
+    serializer : CompiledSchema
+        The compiled schema of the posts, its columns are selected with the sort
+        columns
+
+    Returns
+    -------
+    tuple[list, str | None]
+        The rows of the page and the cursor of the next page, None on the last page
+
+    Raises
+    ------
+    ValueError
+        If the cursor or the limit in the request arguments are invalid
+    """
+    columns = (Posts.timestamp, Posts.id)
+    statement, limit = keyset(
+        serializer.select(*columns).where(Posts.user_id == user_id), *columns
+    )
+    cursor = request.args.get("cursor")
+    before = decode_cursor(cursor, columns) if cursor else None
+
+    try:
+        entries = current_app.timeline.read(user_id, limit, before)
+        fill = entries is None and not cursor
+    except redis.exceptions.RedisError:
+        current_app.logger.warning("Could not read a timeline from Redis")
+        entries, fill = None, False
+
+    if entries is None:
+        rows = db.session.execute(statement).all()
+
+        if fill:
+            current_app.timeline.fill(user_id)
+
+        return split_page(rows, limit, *columns)
+
+    ids = [post_id for _, post_id in entries[:limit]]
+    rows = {
+        row.id: row
+        for row in db.session.execute(
+            serializer.select(Posts.id).where(Posts.id.in_(ids))
+        )
+    }
+
+    # Posts deleted since they were cached are skipped
+    page = [rows[post_id] for post_id in ids if post_id in rows]
+    next_cursor = None
+
+    if len(entries) > limit:
+        next_cursor = encode_cursor(list(entries[limit - 1]))
+
+    return page, next_cursor
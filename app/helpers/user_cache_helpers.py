@@ -0,0 +1,260 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import redis
+
+from app import db
+
+# Caches an identity unless the user was invalidated since the generation read before
+# the database, so a slow miss can not put back an identity which changed meanwhile
+SET_SCRIPT = """
+if (redis.call("GET", KEYS[2]) or "0") == ARGV[1] then
+    redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+end
+return 0
+"""
+
+
+class UserIdentityCache:
+    """
+    Two level cache for the identity (column values) of users. A per-process LRU with
+    a short TTL is checked first, then a shared Redis key, then the database.
+    The password hash is never cached.
+
+    Changes to a user are invalidated locally and in Redis by `invalidate`, which also
+    bumps a generation counter per user. Identities read before an invalidation are
+    not cached afterwards. Other workers can serve a stale identity for at most `ttl`
+    seconds.
+
+    Parameters
+    ----------
+    connection : redis.Redis
+        The Redis connection of the app
+    maxsize : int
+        The maximum number of identities kept in the per-process LRU
+    ttl : float
+        The number of seconds an identity is kept in the per-process LRU
+    redis_ttl : int
+        The number of seconds an identity is kept in Redis
+    """
+
+    key_prefix = "user-identity:"
+    generation_prefix = "user-identity-generation:"
+
+    def __init__(
+        self,
+        connection: redis.Redis,
+        maxsize: int = 1024,
+        ttl: float = 30.0,
+        redis_ttl: int = 300,
+    ):
+        self.redis = connection
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._invalidations = 0
+        self._set = connection.register_script(SET_SCRIPT)
+
+    @staticmethod
+    def _columns() -> list:
+        from app.models import Users
+
+        return [
+            column
+            for column in Users.__table__.columns
+            if column.key != "password_hash"
+        ]
+
+    def get(self, user_id: int) -> dict | None:
+        """
+        Retrieve the identity of a user
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user
+
+        Returns
+        -------
+        dict | None
+            The column values of the user or None if the user does not exist
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._local.get(user_id)
+
+            if entry is not None and entry[0] > now:
+                self._local.move_to_end(user_id)
+                return entry[1]
+
+            invalidations = self._invalidations
+
+        identity, generation = self._get_from_redis(user_id)
+
+        if identity is None:
+            identity = self._get_from_database(user_id)
+
+            if identity is None:
+                return None
+
+            if generation is not None:
+                self._set_in_redis(user_id, identity, generation)
+
+        with self._lock:
+            # An invalidation in this process meanwhile may have dropped this identity
+            if invalidations != self._invalidations:
+                return identity
+
+            self._local[user_id] = (now + self.ttl, identity)
+            self._local.move_to_end(user_id)
+
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+        return identity
+
+    def invalidate(self, *user_ids: int) -> None:
+        """
+        Remove users from the local and the Redis cache
+
+        Parameters
+        ----------
+        user_ids : int
+            The IDs of the users which changed
+        """
+        with self._lock:
+            self._invalidations += 1
+
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+
+        try:
+            pipe = self.redis.pipeline()
+
+            for user_id in user_ids:
+                # Outlives any request, so no read can span an expired generation
+                pipe.incr(self.generation_prefix + str(user_id))
+                pipe.expire(self.generation_prefix + str(user_id), 86400)
+                pipe.delete(self.key_prefix + str(user_id))
+
+            pipe.execute()
+
+        except redis.exceptions.RedisError:
+            pass
+
+    def _get_from_database(self, user_id: int) -> dict | None:
+        from app.models import Users
+
+        row = db.session.execute(
+            db.select(*self._columns()).where(Users.id == user_id)
+        ).first()
+
+        return dict(row._mapping) if row is not None else None
+
+    def _get_from_redis(self, user_id: int) -> tuple[dict | None, bytes | None]:
+        """
+        Read the cached identity of a user and the generation of the user's identity
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user
+
+        Returns
+        -------
+        tuple[dict | None, bytes | None]
+            The identity, None on a miss, and the generation, None when Redis is
+            unavailable
+        """
+        try:
+            value, generation = self.redis.mget(
+                self.key_prefix + str(user_id), self.generation_prefix + str(user_id)
+            )
+
+        except redis.exceptions.RedisError:
+            return None, None
+
+        generation = generation or b"0"
+
+        if value is None:
+            return None, generation
+
+        identity = json.loads(value)
+
+        for column in self._columns():
+            if isinstance(column.type, db.DateTime) and identity.get(column.key):
+                identity[column.key] = datetime.fromisoformat(identity[column.key])
+
+        return identity, generation
+
+    def _set_in_redis(self, user_id: int, identity: dict, generation: bytes) -> None:
+        value = json.dumps(
+            {
+                key: value.isoformat() if isinstance(value, datetime) else value
+                for key, value in identity.items()
+            }
+        )
+
+        try:
+            self._set(
+                keys=[
+                    self.key_prefix + str(user_id),
+                    self.generation_prefix + str(user_id),
+                ],
+                args=[generation, value, self.redis_ttl],
+            )
+
+        except redis.exceptions.RedisError:
+            pass
+
+
+class LazyUser:
+    """
+    Stand-in for `current_user` built from a cached identity. Column values are served
+    from the identity, anything else (relationships, helper methods, the password
+    hash) loads the Users row on first use.
+
+    Parameters
+    ----------
+    identity : dict
+        The cached column values of the user
+    """
+
+    def __init__(self, identity: dict):
+        self._identity = identity
+        self._user = None
+
+    @property
+    def id(self) -> int:
+        return self._identity["id"]
+
+    def _get_current_object(self) -> object:
+        """
+        Load the Users object this proxy stands in for
+
+        Returns
+        -------
+        object
+            A Users object bound to the current session
+        """
+        from app.models import Users
+
+        if self._user is None:
+            self._user = db.session.get(Users, self.id)
+
+        return self._user
+
+    def __getattr__(self, name: str):
+        if name in self._identity:
+            return self._identity[name]
+
+        return getattr(self._get_current_object(), name)
+
+    def __repr__(self) -> str:
+        return "<LazyUser {}>".format(self.id)
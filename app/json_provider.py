@@ -0,0 +1,119 @@
+import json
+from datetime import date
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    JSON provider which encodes responses and decodes request bodies with orjson when
+    it is installed and falls back to the standard library otherwise. Dates and
+    datetimes are written as ISO 8601 strings by both engines. Keys are sorted and
+    pretty printing is off unless changed in the config
+
+    Parameters
+    ----------
+    app : Flask
+        The Flask app, its config must already be loaded
+    """
+
+    ensure_ascii = False
+
+    def __init__(self, app: Flask):
+        super().__init__(app)
+
+        engine = app.config["JSON_ENGINE"]
+
+        if engine not in ("auto", "orjson", "json"):
+            raise ValueError("Unknown JSON engine {}".format(engine))
+
+        if engine == "orjson" and orjson is None:
+            raise ImportError("The orjson JSON engine requires orjson to be installed")
+
+        self.engine = "orjson" if engine != "json" and orjson is not None else "json"
+        self.sort_keys = app.config["JSON_SORT_KEYS"]
+        self.compact = not app.config["JSON_PRETTYPRINT"]
+
+        if self.engine == "orjson":
+            self._options = orjson.OPT_NON_STR_KEYS
+
+            if self.sort_keys:
+                self._options |= orjson.OPT_SORT_KEYS
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+
+        return DefaultJSONProvider.default(o)
+
+    def _dumps_bytes(self, obj, indent: int | None = None) -> bytes:
+        options = self._options | orjson.OPT_INDENT_2 if indent else self._options
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj, **kwargs) -> str:
+        """
+        Serialize data as JSON to a string
+
+        Parameters
+        ----------
+        obj : object
+            The data to serialize
+        kwargs : dict
+            Passed to `json.dumps`, orjson is only used for the `indent` and
+            `separators` arguments Flask itself passes
+
+        Returns
+        -------
+        str
+            The JSON document
+        """
+        if self.engine == "orjson" and kwargs.keys() <= {"indent", "separators"}:
+            return self._dumps_bytes(obj, kwargs.get("indent")).decode()
+
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs):
+        """
+        Deserialize data from a JSON string or bytes, this includes the bodies read by
+        `request.get_json()`
+
+        Parameters
+        ----------
+        s : str | bytes
+            The JSON document
+        kwargs : dict
+            Passed to `json.loads`, which is used instead of orjson when given
+
+        Returns
+        -------
+        object
+            The deserialized data
+        """
+        if self.engine == "orjson" and not kwargs:
+            return orjson.loads(s)
+
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs) -> Response:
+        """
+        Serialize the given arguments as a JSON response
+
+        Returns
+        -------
+        Response
+            A response with the JSON document as body
+        """
+        if self.engine == "json":
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._dumps_bytes(obj, indent=None if self.compact else 2)
+
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,30 @@
+import hmac
+
+from flask import Response, current_app, request
+
+from app import limiter
+from app.errors.handlers import error_response
+from app.helpers.metrics_helpers import metrics_response
+from app.metrics import bp
+
+
+@bp.get("/metrics")
+@limiter.exempt
+def metrics() -> Response:
+    """
+    Endpoint for Prometheus to scrape the request, SQL and Redis metrics of the API.
+    When METRICS_TOKEN is set it has to be sent as bearer token
+
+    Returns
+    -------
+    str
+        The metrics in the Prometheus text format
+    """
+    token = current_app.config["METRICS_TOKEN"]
+
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), "Bearer {}".format(token)
+    ):
+        return error_response(401)
+
+    return metrics_response()
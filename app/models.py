@@ -1,6 +1,10 @@
 from app import db, jwt
+from app.helpers.password_helpers import HasherBusy
+from app.helpers.replica_helpers import current_identity
+from app.helpers.user_cache_helpers import LazyUser
 from flask import current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import Session, object_session
 from datetime import datetime
 import redis
 import rq
@@ -9,8 +13,9 @@ import rq
 @jwt.user_lookup_loader
 def user_loader_callback(jwt_header: dict, jwt_data: dict) -> object:
     """
-    HUser loader function which uses the JWT identity to retrieve a user object.
-    Method is called on protected routes
+    User loader function which uses the JWT identity to retrieve a user object.
+    Method is called on protected routes. The identity is served from the user cache
+    and the Users row is only loaded when a route needs more than its columns
 
     Parameters
     ----------
@@ -22,9 +27,10 @@ def user_loader_callback(jwt_header: dict, jwt_data: dict) -> object:
     Returns
     -------
     object
-        Returns a users object containing the user information
+        Returns a lazy users object containing the user information
     """
-    return Users.query.filter_by(id=jwt_data["sub"]).first()
+    identity = current_app.user_cache.get(jwt_data["sub"])
+    return LazyUser(identity) if identity is not None else None
 
 
 # defines the Users database table
@@ -34,23 +40,27 @@ class Users(db.Model):
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), unique=False, nullable=False)
+    password_hash = db.Column(db.String(256), unique=False, nullable=False)
     birthday = db.Column(db.DateTime, nullable=False)
     join_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # Denormalized counts, kept up to date by app.helpers.counter_helpers
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     posts = db.relationship("Posts", backref="user", lazy="dynamic")
     comments = db.relationship("Comments", backref="user", lazy="dynamic")
     tasks = db.relationship("Tasks", backref="user", lazy="dynamic")
 
     def set_password(self, password: str):
         """
-        Helper function to generate the password hash of a user
+        Helper function to generate the password hash of a user in the password hashing
+        pool of the app
 
         Parameters
         ----------
         password : str
             The password provided by the user when registering
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = current_app.password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
         """
@@ -67,7 +77,35 @@ class Users(db.Model):
         bool
             Returns True if the password is a match. If not False is returned
         """
-        return check_password_hash(self.password_hash, password)
+        return current_app.password_hasher.verify(self.password_hash, password)
+
+    def rehash_password(self, password: str) -> bool:
+        """
+        Helper function to regenerate the password hash of a user after a successful
+        login when it was generated with other parameters than the configured ones.
+        The caller commits the change. When the hashing pool is busy the hash is kept
+        and regenerated on a later login
+
+        Parameters
+        ----------
+        password : str
+            The password the user just logged in with
+
+        Returns
+        -------
+        bool
+            Returns True if the password hash was regenerated
+        """
+        if not current_app.password_hasher.needs_rehash(self.password_hash):
+            return False
+
+        try:
+            self.set_password(password)
+
+        except HasherBusy:
+            return False
+
+        return True
 
     def launch_task(self, name: str, description: str, **kwargs) -> object:
         """
@@ -86,7 +124,7 @@ class Users(db.Model):
             A Tasks object containing the task information
         """
         rq_job = current_app.task_queue.enqueue(
-            "app.tasks.long_running_jobs" + name, **kwargs
+            "app.tasks.long_running_jobs." + name, meta={"user_id": self.id}, **kwargs
         )
         task = Tasks(
             task_id=rq_job.get_id(), name=name, description=description, user=self
@@ -95,16 +133,16 @@ class Users(db.Model):
 
         return task
 
-    def get_tasks_in_progress(self) -> list:
+    def get_tasks_in_progress(self) -> object:
         """
         Helper function which retrieves the background tasks that are still in progress
 
         Returns
         -------
-        list
-            A list of Tasks objects
+        object
+            A query of Tasks objects, so the caller can paginate it
         """
-        return Tasks.query.filter_by(user=self, complete=False).all()
+        return Tasks.query.filter_by(user=self, complete=False)
 
     def get_task_in_progress(self, name: str) -> object:
         """
@@ -122,38 +160,217 @@ class Users(db.Model):
         """
         return Tasks.query.filter_by(name=name, user=self, complete=False).first()
 
-    def get_completed_tasks(self) -> dict:
+    def get_completed_tasks(self) -> object:
         """
         Helper function to retrieve all completed tasks
 
         Returns
         -------
-        dict
-            A dictionary of Tasks objects
+        object
+            A query of Tasks objects, so the caller can paginate it
         """
-        return Tasks.query.filter_by(user=self, complete=True).all()
+        return Tasks.query.filter_by(user=self, complete=True)
+
+
+@event.listens_for(Users, "after_update")
+@event.listens_for(Users, "after_delete")
+def _mark_user_changed(mapper, connection, target: Users) -> None:
+    """
+    Remember which users changed so their cached identity can be dropped on commit
+    """
+    session = object_session(target)
+    session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    """
+    Drop the cached identity of every user changed within the committed transaction
+    """
+    changed_users = session.info.pop("changed_users", None)
+
+    if changed_users:
+        current_app.user_cache.invalidate(*changed_users)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop("changed_users", None)
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state) -> None:
+    state = orm_execute_state
+
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_reads_after_write(session: Session) -> None:
+    """
+    Pin the reads of the user behind the request to the primary after a committed
+    write, so the following requests do not read from a lagging replica
+    """
+    if session.info.pop("wrote", False):
+        user_id = current_identity()
+
+        if user_id is not None:
+            current_app.replica_router.mark_write(user_id)
 
 
 class Posts(db.Model):
+    # Serves the newest first listing of a user's posts
+    __table_args__ = (
+        db.Index("ix_posts_user_id_timestamp", "user_id", "timestamp", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     body = db.Column(db.String(140))
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     comments = db.relationship("Comments", backref="post", lazy="dynamic")
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
 
 class Comments(db.Model):
+    # Serves the newest first listing of the comments on a post
+    __table_args__ = (
+        db.Index("ix_comments_post_id_timestamp", "post_id", "timestamp", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     body = db.Column(db.String(140))
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     post_id = db.Column(db.Integer, db.ForeignKey("posts.id"))
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+
+
+# Full-text search index of the post and comment bodies. SQLite keeps both in one FTS5
+# table whose rowid encodes the document (post id * 2, comment id * 2 + 1) and which
+# triggers keep in sync. PostgreSQL gets a generated tsvector column with a GIN index
+SEARCH_DOCUMENTS = {"posts": 0, "comments": 1}
+
+SEARCH_INDEX_DDL = {
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+        "USING fts5(body, tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS {0}_search_insert AFTER INSERT ON {0} BEGIN "
+        "INSERT INTO search_index(rowid, body) VALUES (new.id * 2 + {1}, new.body); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS {0}_search_update AFTER UPDATE OF body ON {0} "
+        "BEGIN "
+        "UPDATE search_index SET body = new.body WHERE rowid = new.id * 2 + {1}; "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS {0}_search_delete AFTER DELETE ON {0} BEGIN "
+        "DELETE FROM search_index WHERE rowid = old.id * 2 + {1}; "
+        "END",
+    ),
+    "postgresql": (
+        "ALTER TABLE {0} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', coalesce(body, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_{0}_search_vector ON {0} "
+        "USING GIN (search_vector)",
+    ),
+}
+
+SEARCH_INDEX_DROP_DDL = {
+    "sqlite": (
+        "DROP TRIGGER IF EXISTS {0}_search_insert",
+        "DROP TRIGGER IF EXISTS {0}_search_update",
+        "DROP TRIGGER IF EXISTS {0}_search_delete",
+        "DROP TABLE IF EXISTS search_index",
+    ),
+    "postgresql": (
+        "DROP INDEX IF EXISTS ix_{0}_search_vector",
+        "ALTER TABLE {0} DROP COLUMN IF EXISTS search_vector",
+    ),
+}
+
+
+def search_index_statements(dialect: str, drop: bool = False) -> list:
+    """
+    The statements which create (or drop) the full-text search index of the posts
+    and comments. They are idempotent, so migrations can run them with `op.execute`
+    and `flask reindex-search` runs them before it fills the index
+
+    Parameters
+    ----------
+    dialect : str
+        The name of the database dialect
+    drop : bool
+        Whether to return the statements dropping the index
+
+    Returns
+    -------
+    list
+        The SQL statements, empty for dialects without a supported index
+    """
+    ddl = (SEARCH_INDEX_DROP_DDL if drop else SEARCH_INDEX_DDL).get(dialect, ())
+    statements = []
+
+    for table, kind in SEARCH_DOCUMENTS.items():
+        for statement in ddl:
+            statement = statement.format(table, kind)
+
+            if statement not in statements:
+                statements.append(statement)
+
+    return statements
+
+
+def include_search_index(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Alembic `include_object` hook which hides the search index from autogenerate,
+    the FTS5 tables and the tsvector columns are not mapped so it would drop them
+    """
+    if type_ == "table":
+        return not (name == "search_index" or name.startswith("search_index_"))
+
+    if type_ == "column":
+        return name != "search_vector"
+
+    if type_ == "index":
+        return not (name or "").endswith("_search_vector")
+
+    return True
+
+
+def _register_search_index(table: str, kind: int) -> None:
+    """
+    Create the search index DDL of a document table together with the table, for
+    databases created with `db.create_all`
+    """
+    for dialect, statements in SEARCH_INDEX_DDL.items():
+        for statement in statements:
+            event.listen(
+                db.metadata.tables[table],
+                "after_create",
+                DDL(statement.format(table, kind)).execute_if(dialect=dialect),
+            )
+
+    event.listen(
+        db.metadata.tables[table],
+        "after_drop",
+        DDL("DROP TABLE IF EXISTS search_index").execute_if(dialect="sqlite"),
+    )
+
+
+for table, kind in SEARCH_DOCUMENTS.items():
+    _register_search_index(table, kind)
 
 
 class RevokedTokenModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    jti = db.Column(db.String(120))
-    date_revoked = db.Column(db.DateTime, default=datetime.utcnow)
+    jti = db.Column(db.String(120), index=True, unique=True)
+    date_revoked = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    expires = db.Column(db.DateTime, index=True)
 
     def add(self):
         """
@@ -182,6 +399,11 @@ class RevokedTokenModel(db.Model):
 
 
 class Tasks(db.Model):
+    # Serves the active and finished task listings of a user
+    __table_args__ = (
+        db.Index("ix_tasks_user_id_complete", "user_id", "complete", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.String(36), index=True)
     name = db.Column(db.String(128), index=True)
@@ -201,3 +423,40 @@ class Tasks(db.Model):
     def get_progress(self):
         job = self.get_rq_job()
         return job.meta.get("progress", 0) if job is not None else 100
+
+    @staticmethod
+    def get_progress_many(task_ids: list) -> dict:
+        """
+        Helper function which retrieves the progress and status of many background tasks
+        with a single pipelined Redis call
+
+        Parameters
+        ----------
+        task_ids : list
+            The RQ job IDs of the tasks
+
+        Returns
+        -------
+        dict
+            A dictionary mapping each task ID to its progress and status
+        """
+        try:
+            jobs = rq.job.Job.fetch_many(task_ids, connection=current_app.redis)
+
+        except redis.exceptions.RedisError:
+            jobs = [None] * len(task_ids)
+
+        progress = {}
+
+        for task_id, job in zip(task_ids, jobs):
+            if job is None:
+                progress[task_id] = {"progress": 100, "status": None}
+                continue
+
+            status = job.get_status(refresh=False)
+            progress[task_id] = {
+                "progress": job.meta.get("progress", 0),
+                "status": getattr(status, "value", status),
+            }
+
+        return progress
@@ -1,44 +1,96 @@
-from flask import request, jsonify, Response
+from flask import current_app, request, jsonify, Response
 
 from app import db
 from app.posts import bp
 from app.models import Posts
 from app.schemas import PostsSchema
+from app.serializers import compile_schema
 from app.errors.handlers import bad_request
+from app.helpers.counter_helpers import adjust_counters
+from app.helpers.field_helpers import select_fields
+from app.helpers.pagination_helpers import paginate
+from app.helpers.streaming_helpers import stream
+from app.helpers.query_budget_helpers import query_budget
+from app.helpers.replica_helpers import read_only
+from app.helpers.timeline_helpers import timeline_page
 
 from flask_jwt_extended import jwt_required, current_user
 
 from marshmallow import ValidationError
 
 import asyncio
-from aiohttp import ClientSession
 
 # Declare database schemas so they can be returned as JSON objects
 post_schema = PostsSchema()
 posts_schema = PostsSchema(many=True)
+posts_serializer = compile_schema(posts_schema)
 
 
 @bp.get("get/user/posts")
+@query_budget(3)
 @jwt_required()
-def get_posts() -> tuple[Response, int]:
+@read_only
+def get_posts() -> tuple[Response, int] | Response:
     """
-    Returns all posts submitted by the user making the request
+    Returns a page of the posts submitted by the user making the request, newest first.
+    The `limit` and `cursor` query parameters select the page. With the `stream`
+    query parameter set to `json` or `ndjson` all posts are streamed instead. The
+    `fields` query parameter selects the returned fields
 
     Returns
     -------
     JSON
-        A JSON object containing all post data
+        A JSON object containing the post data and the cursor of the next page
     """
-    posts = current_user.posts.all()
+    try:
+        serializer = select_fields(posts_serializer)
+        query = Posts.query.filter_by(user_id=current_user.id).with_entities(
+            *serializer.columns_with(Posts.timestamp, Posts.id)
+        )
+
+        if request.args.get("stream"):
+            return stream(query, serializer, Posts.timestamp, Posts.id)
 
-    return posts_schema.jsonify(posts), 200
+        posts, next_cursor = paginate(query, Posts.timestamp, Posts.id)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    return jsonify({"posts": serializer.dump(posts), "next": next_cursor}), 200
+
+
+@bp.get("/get/user/timeline")
+@query_budget(4)
+@jwt_required()
+@read_only
+def get_timeline() -> tuple[Response, int] | Response:
+    """
+    Returns a page of the home timeline of the user making the request, newest first.
+    Timelines are cached in Redis and filled as posts are submitted. The `limit` and
+    `cursor` query parameters select the page, the `fields` query parameter selects
+    the returned fields
+
+    Returns
+    -------
+    JSON
+        A JSON object containing the post data and the cursor of the next page
+    """
+    try:
+        serializer = select_fields(posts_serializer)
+        posts, next_cursor = timeline_page(current_user.id, serializer)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    return jsonify({"posts": serializer.dump(posts), "next": next_cursor}), 200
 
 
 @bp.get("/get/user/post/<int:id>")
+@query_budget(3)
 @jwt_required()
-def get_post_by_id(id: int) -> tuple[Response, int] | Response:
+@read_only
+async def get_post_by_id(id: int) -> tuple[Response, int] | Response:
     """
-    Returns a specific post based on the ID in the URL
+    Returns a specific post based on the ID in the URL, read through an async session.
+    The `fields` query parameter selects the returned fields
 
     Parameters
     ----------
@@ -50,15 +102,24 @@ def get_post_by_id(id: int) -> tuple[Response, int] | Response:
     JSON
         A JSON object containing all post data
     """
-    post = Posts.query.get(id)
+    try:
+        serializer = select_fields(posts_serializer)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    result = await current_app.async_db.execute(
+        serializer.select().where(Posts.id == id)
+    )
+    post = result.first()
 
     if not post:
         return bad_request("No post found")
 
-    return post_schema.jsonify(post), 200
+    return serializer.jsonify(post, many=False), 200
 
 
 @bp.post("/post/user/submit/post")
+@query_budget(5)
 @jwt_required()
 def submit_post() -> tuple[Response, int] | Response:
     """
@@ -74,15 +135,22 @@ def submit_post() -> tuple[Response, int] | Response:
     except ValidationError as e:
         return bad_request(e.messages[0])
 
-    post = Posts(body=result["body"], user=current_user)
+    post = Posts(body=result["body"], user_id=current_user.id)
 
     db.session.add(post)
+    # Flush so the ID and timestamp are assigned before the timeline push reads them
+    db.session.flush()
+    adjust_counters(current_user.id, posts=1)
+    post_id, timestamp = post.id, post.timestamp
     db.session.commit()
 
+    current_app.timeline.push(current_user.id, post_id, timestamp)
+
     return jsonify({"msg": "Post succesfully submitted"}), 201
 
 
 @bp.delete("/delete/user/post/<int:id>")
+@query_budget(6)
 @jwt_required()
 def delete_post(id: int) -> tuple[Response, int] | Response:
     """
@@ -106,13 +174,18 @@ def delete_post(id: int) -> tuple[Response, int] | Response:
     if post.user_id != current_user.id:
         return bad_request("Unauthorized")
 
+    user_id = post.user_id
     db.session.delete(post)
+    adjust_counters(user_id, posts=-1)
     db.session.commit()
 
+    current_app.timeline.remove(user_id, id)
+
     return jsonify({"msg": "Post succesfully deleted"}), 201
 
 
 @bp.get("/get/user/posts/async")
+@query_budget(1)
 @jwt_required()
 async def async_posts_api_call() -> tuple[dict, int]:
     """
@@ -123,18 +196,11 @@ async def async_posts_api_call() -> tuple[dict, int]:
     str
         A JSON object containing the posts
     """
-    urls = [
-        "https://jsonplaceholder.typicode.com/posts",
-        "https://jsonplaceholder.typicode.com/posts",
-        "https://jsonplaceholder.typicode.com/posts",
-        "https://jsonplaceholder.typicode.com/posts",
-        "https://jsonplaceholder.typicode.com/posts",
-    ]
-
-    async with ClientSession() as session:
-        tasks = (session.get(url) for url in urls)
-        user_posts_res = await asyncio.gather(*tasks)
-        json_res = [await r.json() for r in user_posts_res]
+    urls = ["{}/posts".format(current_app.config["EXTERNAL_API_URL"])] * 5
+
+    # Identical URLs share one upstream call and responses are cached by the client
+    client = current_app.http_client
+    json_res = await asyncio.gather(*(client.get_json(url) for url in urls))
 
     response_data = {"posts": json_res}
 
@@ -0,0 +1,48 @@
+from flask import Response, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import db
+from app.errors.handlers import bad_request, error_response
+from app.helpers.pagination_helpers import keyset, split_page
+from app.helpers.query_budget_helpers import query_budget
+from app.helpers.replica_helpers import read_only
+from app.helpers.search_helpers import search_statement, search_terms
+from app.search import bp
+
+
+@bp.get("/posts-and-comments")
+@query_budget(3)
+@jwt_required()
+@read_only
+def search() -> tuple[Response, int] | Response:
+    """
+    Endpoint for a full-text search over all posts and comments. The `q` query
+    parameter holds the words to search for, results contain all of them and are
+    ranked best match first. The `limit` and `cursor` query parameters select the page
+
+    Returns
+    -------
+    str
+        A JSON object containing the matching posts and comments and the cursor of
+        the next page
+    """
+    terms = search_terms(request.args.get("q", ""))
+
+    if not terms:
+        return bad_request("A search term is required")
+
+    try:
+        statement, *columns = search_statement(terms, db.engine.dialect.name)
+        statement, limit = keyset(statement, *columns)
+    except NotImplementedError as e:
+        return error_response(501, message=str(e))
+    except ValueError as e:
+        return bad_request(str(e))
+
+    rows, next_cursor = split_page(db.session.execute(statement).all(), limit, *columns)
+    results = [
+        {"type": row.type, "id": row.id, "body": row.body, "score": row.score}
+        for row in rows
+    ]
+
+    return jsonify({"results": results, "next": next_cursor}), 200
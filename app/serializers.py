@@ -0,0 +1,263 @@
+from flask import Response, jsonify
+from marshmallow import Schema, fields
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import ColumnProperty
+
+from app import db
+
+# The number of field selections of a compiled schema which are kept compiled
+NARROWED_SCHEMA_CACHE_SIZE = 64
+
+
+class CompiledSchema:
+    """
+    A serializer compiled from a marshmallow model schema (honouring its `only` and
+    `exclude` sets) into two specialized dump functions: one which unpacks Core rows
+    selected with `columns` positionally and one which reads attributes from objects.
+    The output is identical to `schema.dump`, without marshmallow's per field
+    dispatch. Use `compile_schema` to create one
+
+    Parameters
+    ----------
+    schema : Schema
+        An instance of a SQLAlchemy model schema
+    """
+
+    def __init__(self, schema: Schema):
+        if any(
+            key[0] in ("pre_dump", "post_dump") and hooks
+            for key, hooks in schema._hooks.items()
+        ):
+            raise ValueError("Schemas with dump hooks can not be compiled")
+
+        model = schema.opts.model
+        self.schema = schema
+        self.many = schema.many
+        self.columns = []
+
+        # Unordered schemas keep their fields in a set, the declaration order makes
+        # the columns and keys the same in every process
+        self._dump_fields = [
+            (name, schema.dump_fields[name])
+            for name in schema.declared_fields
+            if name in schema.dump_fields
+        ]
+
+        for name, field in self._dump_fields:
+            column = getattr(model, field.attribute or name, None)
+
+            if column is None or not isinstance(
+                getattr(column, "property", None), ColumnProperty
+            ):
+                raise ValueError("Field {} is not a model column".format(name))
+
+            self.columns.append(column)
+
+        self._fields = tuple(column.key for column in self.columns)
+        self._dump_row, self._dump_object = self._compile()
+        self._narrowed = {}
+
+    def _compile(self) -> tuple:
+        namespace = {}
+        values = []
+
+        for i, (name, field) in enumerate(self._dump_fields):
+            namespace["_serialize{}".format(i)] = field._serialize
+            data_key = field.data_key if field.data_key is not None else name
+            values.append(
+                "{!r}: {}".format(data_key, _value_expression(i, name, field))
+            )
+
+        body = "    return {{{}}}\n".format(", ".join(values))
+        variables = ", ".join("v{}".format(i) for i in range(len(self.columns)))
+        attributes = ", ".join("obj.{}".format(key) for key in self._fields)
+        source = (
+            "def dump_row(obj):\n"
+            "    {variables}, *_ = obj\n"
+            "{body}"
+            "def dump_object(obj):\n"
+            "    {variables}, = {attributes},\n"
+            "{body}"
+        ).format(variables=variables, attributes=attributes, body=body)
+
+        exec(compile(source, "<compiled {}>".format(self.schema), "exec"), namespace)
+
+        return namespace["dump_row"], namespace["dump_object"]
+
+    def only(self, names: list) -> "CompiledSchema":
+        """
+        The compiled schema narrowed down to some of its fields, it selects and
+        serializes only their columns
+
+        Parameters
+        ----------
+        names : list
+            The names of the fields to keep
+
+        Returns
+        -------
+        CompiledSchema
+            The narrowed compiled schema
+
+        Raises
+        ------
+        ValueError
+            If a name is not a field of the schema
+        """
+        unknown = [name for name in names if name not in self.schema.dump_fields]
+
+        if unknown:
+            raise ValueError("Unknown fields: {}".format(", ".join(unknown)))
+
+        key = frozenset(names)
+
+        if key == frozenset(self.schema.dump_fields):
+            return self
+
+        narrowed = self._narrowed.get(key)
+
+        if narrowed is None:
+            narrowed = CompiledSchema(
+                type(self.schema)(
+                    many=self.many, only=tuple(key), exclude=self.schema.exclude
+                )
+            )
+
+            if len(self._narrowed) < NARROWED_SCHEMA_CACHE_SIZE:
+                self._narrowed[key] = narrowed
+
+        return narrowed
+
+    def columns_with(self, *columns) -> list:
+        """
+        The columns the compiled schema needs followed by any of `columns` it does not
+        select, such as the sort columns of a page
+
+        Parameters
+        ----------
+        columns : Column
+            The extra columns
+
+        Returns
+        -------
+        list
+            The columns to select, rows of them can still be dumped positionally
+        """
+        return self.columns + [
+            column for column in columns if column.key not in self._fields
+        ]
+
+    def select(self, *columns):
+        """
+        Helper function which selects exactly the columns the compiled schema needs,
+        followed by any of `columns` it does not select
+
+        Parameters
+        ----------
+        columns : Column
+            The extra columns
+
+        Returns
+        -------
+        Select
+            A select statement, rows it returns can be dumped positionally
+        """
+        return db.select(*self.columns_with(*columns))
+
+    def _dumper(self, obj) -> object:
+        if isinstance(obj, Row) and obj._fields[: len(self._fields)] == self._fields:
+            return self._dump_row
+
+        return self._dump_object
+
+    def dump(self, obj, many: bool | None = None) -> dict | list:
+        """
+        Serialize an object, a row or a collection of them
+
+        Parameters
+        ----------
+        obj : object
+            The object(s) or row(s) to serialize
+        many : bool, optional
+            Whether obj is a collection, defaults to the `many` of the schema
+
+        Returns
+        -------
+        dict | list
+            The same data `schema.dump` would return
+        """
+        many = self.many if many is None else many
+
+        if not many:
+            return self._dumper(obj)(obj)
+
+        obj = list(obj)
+
+        if not obj:
+            return []
+
+        dump = self._dumper(obj[0])
+        return [dump(item) for item in obj]
+
+    def jsonify(self, obj, many: bool | None = None) -> Response:
+        """
+        Serialize an object, a row or a collection of them into a JSON response
+
+        Parameters
+        ----------
+        obj : object
+            The object(s) or row(s) to serialize
+        many : bool, optional
+            Whether obj is a collection, defaults to the `many` of the schema
+
+        Returns
+        -------
+        Response
+            A JSON response
+        """
+        return jsonify(self.dump(obj, many=many))
+
+
+def _value_expression(i: int, name: str, field: fields.Field) -> str:
+    """
+    Build the Python expression which serializes the value `v{i}` the way `field` does
+    """
+    value = "v{}".format(i)
+    field_type = type(field)
+
+    if field_type is fields.Integer and not field.as_string:
+        expression = "int({})".format(value)
+
+    elif field_type is fields.String:
+        expression = "{0} if {0}.__class__ is str else _serialize{1}({0}, None, None)"
+        expression = expression.format(value, i)
+
+    elif field_type is fields.Boolean:
+        expression = "{0} if {0}.__class__ is bool else _serialize{1}({0}, None, None)"
+        expression = expression.format(value, i)
+
+    elif field_type is fields.DateTime and field.format in (None, "iso", "iso8601"):
+        expression = "{}.isoformat()".format(value)
+
+    else:
+        # Anything without a known fast path goes through the field itself
+        return "_serialize{}({}, {!r}, obj)".format(i, value, name)
+
+    return "None if {} is None else {}".format(value, expression)
+
+
+def compile_schema(schema: Schema) -> CompiledSchema:
+    """
+    Compile a marshmallow model schema into a fast path serializer
+
+    Parameters
+    ----------
+    schema : Schema
+        An instance of a SQLAlchemy model schema
+
+    Returns
+    -------
+    CompiledSchema
+        A serializer with the same output as the schema
+    """
+    return CompiledSchema(schema)
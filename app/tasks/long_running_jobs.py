@@ -1,8 +1,11 @@
 import sys
-from datetime import time
+import time
+
+from rq import get_current_job
 
 from app import create_app
-from app.helpers.task_helpers import _set_task_progress
+from app.helpers.revocation_helpers import remove_old_tokens, schedule_token_removal
+from app.helpers.task_helpers import ProgressReporter
 
 # Create the app in order to operate within the context of the app
 app = create_app()
@@ -12,23 +15,39 @@ def count_seconds(**kwargs: int) -> None:
     """
     A background task which counts up to the number of seconds passed as an argument
     """
-    with app.app_context():
+    with app.app_context(), ProgressReporter() as reporter:
         try:
             number: int | None = kwargs.get("number")
 
             if number:
-                _set_task_progress(0)
-
-                i = 0
+                reporter.update(0)
 
-                for i in range(0, number):
-                    i += 1
+                for i in range(1, number + 1):
                     time.sleep(1)
-                    _set_task_progress(100 * i // number)
+                    reporter.update(100 * i // number)
 
         # TODO: Make this a specific except type, no bare except
         except:
             app.logger.error("Unhandled exception", exc_info=sys.exc_info())
 
+
+def remove_old_jwts(**kwargs) -> None:
+    """
+    A periodic background task which removes old tokens from the Revoked Token table
+    and schedules its next run after JWT_REVOCATION_PURGE_INTERVAL seconds, unless it
+    was unscheduled meanwhile
+    """
+    with app.app_context():
+        try:
+            removed = remove_old_tokens(
+                kwargs["days"],
+                chunk_size=kwargs["chunk_size"],
+                include_expired=kwargs.get("include_expired", False),
+            )
+            app.logger.info("Removed {} old tokens".format(removed))
+
+        except Exception:
+            app.logger.error("Unhandled exception", exc_info=sys.exc_info())
+
         finally:
-            _set_task_progress(100)
+            schedule_token_removal(after=get_current_job().get_id(), **kwargs)
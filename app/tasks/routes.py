@@ -1,15 +1,32 @@
-from flask import Response, jsonify
+import json
+
+import redis
+from flask import Response, current_app, jsonify, request
 from flask_jwt_extended import current_user, jwt_required
 
 from app import db
-from app.errors.handlers import bad_request
+from app.errors.handlers import bad_request, error_response
+from app.helpers.field_helpers import select_fields
+from app.helpers.pagination_helpers import paginate
+from app.helpers.query_budget_helpers import query_budget
+from app.helpers.replica_helpers import read_only
+from app.helpers.streaming_helpers import stream
+from app.helpers.task_helpers import (
+    progress_channel,
+    progress_latest_key,
+    progress_sequence_key,
+)
+from app.models import Tasks
 from app.schemas import TasksSchema
+from app.serializers import compile_schema
 from app.tasks import bp
 
 tasks_schema = TasksSchema(many=True)
+tasks_serializer = compile_schema(tasks_schema)
 
 
 @bp.get("/background-task/count-seconds/<int:number>")
+@query_budget(4)
 @jwt_required()
 def background_worker_count_seconds(number: int) -> tuple[Response, int] | Response:
     """
@@ -36,30 +53,188 @@ def background_worker_count_seconds(number: int) -> tuple[Response, int] | Respo
 
 
 @bp.get("/get/active-background-tasks")
+@query_budget(4)
 @jwt_required()
-def active_background_tasks() -> tuple[Response, int] | str:
+@read_only
+def active_background_tasks() -> tuple[Response, int] | Response:
     """
-    Endpoint to retrieve all the active background tasks
+    Endpoint to retrieve a page of the active background tasks, newest first, with
+    the progress and status of each task fetched from Redis in one round trip.
+    The `limit` and `cursor` query parameters select the page. With the `stream`
+    query parameter set to `json` or `ndjson` all tasks are streamed instead. The
+    `fields` query parameter selects the returned fields, the progress and status are
+    always included
 
     Returns
     -------
     str
-        A JSON object containing the active tasks
+        A JSON object containing the active tasks and the cursor of the next page
     """
-    tasks = current_user.get_tasks_in_progress()
-    return tasks_schema.jsonify(tasks), 200
+    try:
+        serializer = select_fields(tasks_serializer)
+        query = current_user.get_tasks_in_progress().with_entities(
+            *serializer.columns_with(Tasks.id, Tasks.task_id)
+        )
+
+        if request.args.get("stream"):
+            return stream(query, serializer, Tasks.id)
+
+        rows, next_cursor = paginate(query, Tasks.id)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    progress = Tasks.get_progress_many([row.task_id for row in rows])
+    tasks = serializer.dump(rows)
+
+    for row, task in zip(rows, tasks):
+        task.update(progress[row.task_id])
+
+    return jsonify({"tasks": tasks, "next": next_cursor}), 200
 
 
 @bp.get("/get/finished-background-tasks")
+@query_budget(4)
 @jwt_required()
-def finished_background_tasks() -> tuple[Response, int] | str:
+@read_only
+def finished_background_tasks() -> tuple[Response, int] | Response:
+    """
+    Endpoint to retrieve a page of the finished background tasks, newest first.
+    The `limit` and `cursor` query parameters select the page. With the `stream`
+    query parameter set to `json` or `ndjson` all tasks are streamed instead. The
+    `fields` query parameter selects the returned fields
+
+    Returns
+    -------
+    str
+        A JSON object containing the finished tasks and the cursor of the next page
     """
-    Endpoint to retrieve the finished background tasks
+    try:
+        serializer = select_fields(tasks_serializer)
+        query = current_user.get_completed_tasks().with_entities(
+            *serializer.columns_with(Tasks.id)
+        )
+
+        if request.args.get("stream"):
+            return stream(query, serializer, Tasks.id)
+
+        tasks, next_cursor = paginate(query, Tasks.id)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    return jsonify({"tasks": serializer.dump(tasks), "next": next_cursor}), 200
+
+
+def format_event(data: dict, event: str, event_id: int | None = None) -> str:
+    """
+    Helper function which formats a Server-Sent Event
+
+    Parameters
+    ----------
+    data : dict
+        The payload of the event
+    event : str
+        The event type
+    event_id : int, optional
+        The ID of the event, sent back by the client as Last-Event-ID on reconnect
 
     Returns
     -------
     str
-        A JSON object containing the finished tasks
+        The event in the text/event-stream format
+    """
+    lines = "event: {}\ndata: {}\n\n".format(event, json.dumps(data))
+    return "id: {}\n{}".format(event_id, lines) if event_id is not None else lines
+
+
+@bp.get("/stream/background-task-progress")
+@query_budget(2)
+@jwt_required()
+def background_task_progress_stream() -> tuple[Response, int] | Response:
+    """
+    Endpoint which streams the progress of the user's background tasks as
+    Server-Sent Events, pushed from Redis pub/sub as the tasks report it. A comment is
+    sent as heartbeat when nothing happened for TASK_PROGRESS_HEARTBEAT seconds.
+    A client reconnecting with a Last-Event-ID header that is behind first receives
+    the latest progress of every task which changed since, including the tasks which
+    completed meanwhile
+
+    Returns
+    -------
+    Response
+        A text/event-stream response, or a 503 error when the stream limit of the
+        worker is reached or Redis is unavailable
     """
-    tasks = current_user.get_completed_tasks()
-    return tasks_schema.jsonify(tasks), 200
+    streams = current_app.progress_streams
+
+    if not streams.acquire(blocking=False):
+        return error_response(503, message="Too many progress streams")
+
+    user_id = current_user.id
+    heartbeat = current_app.config["TASK_PROGRESS_HEARTBEAT"]
+    pubsub = current_app.redis.pubsub(ignore_subscribe_messages=True)
+    events = ["retry: {}\n\n".format(current_app.config["TASK_PROGRESS_RETRY"])]
+
+    try:
+        # Subscribe before reading the sequence so no event falls in between
+        pubsub.subscribe(progress_channel(user_id))
+        last_event_id = request.headers.get("Last-Event-ID", type=int)
+
+        if last_event_id is not None:
+            sequence = int(current_app.redis.get(progress_sequence_key(user_id)) or 0)
+
+            if last_event_id < sequence:
+                latest = current_app.redis.hgetall(progress_latest_key(user_id))
+
+                for task_id, event in sorted(latest.items()):
+                    event = json.loads(event)
+
+                    if event["id"] > last_event_id:
+                        events.append(
+                            format_event(
+                                {
+                                    "task_id": task_id.decode(),
+                                    "progress": event["progress"],
+                                },
+                                "progress",
+                                sequence,
+                            )
+                        )
+
+    except redis.exceptions.RedisError:
+        pubsub.close()
+        streams.release()
+        return error_response(503, message="Progress updates are unavailable")
+
+    # The generator does not use the request context, so the database session is
+    # released when this view returns instead of being held for the whole stream
+    def generate():
+        yield from events
+
+        try:
+            while True:
+                message = pubsub.get_message(timeout=heartbeat)
+
+                if message is None:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                data = json.loads(message["data"])
+                event_id = data.pop("id")
+                yield format_event(data, "progress", event_id)
+
+        except redis.exceptions.RedisError:
+            return
+
+    def close():
+        pubsub.close()
+        streams.release()
+
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Runs when the server closes the response, also if the client went away
+    response.call_on_close(close)
+
+    return response
@@ -0,0 +1,211 @@
+import asyncio
+import os
+import tempfile
+import time
+import threading
+import unittest
+from flask import Response
+from sqlalchemy import event, select
+from app import create_app, create_asgi_app, db
+from app.helpers.async_db_helpers import AsyncDatabase, async_database_uri
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class TestAsyncDatabase(unittest.TestCase):
+    def setUp(self):
+        # The async engine needs a database file it can share with the sync engine
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+
+        config_class = type(
+            "FileTestConfig",
+            (TestConfig,),
+            {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + self.db_path},
+        )
+
+        self.app = create_app(config_class)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.remove(self.db_path)
+
+    def test_async_database_uri(self):
+        self.assertIsNone(async_database_uri({"SQLALCHEMY_DATABASE_URI": "sqlite:///"}))
+        self.assertEqual(
+            "sqlite+aiosqlite:///app.db",
+            async_database_uri({"SQLALCHEMY_DATABASE_URI": "sqlite:///app.db"}),
+        )
+        self.assertEqual(
+            "postgresql+asyncpg://u:p@db/app",
+            async_database_uri(
+                {
+                    "SQLALCHEMY_DATABASE_URI": "sqlite:///",
+                    "SQLALCHEMY_ASYNC_DATABASE_URI": "postgresql+asyncpg://u:p@db/app",
+                }
+            ),
+        )
+
+    def test_hot_reads_use_async_session(self):
+        self.assertTrue(self.app.async_db.enabled)
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            c.post(
+                "/api/posts/post/user/submit/post",
+                headers=headers,
+                json={"body": "This is a test post"},
+            )
+            c.post(
+                "/api/comments/post/user/submit/comment",
+                headers=headers,
+                json={"body": "This is a test comment", "post_id": 1},
+            )
+
+            resp = c.get("/api/posts/get/user/post/1", headers=headers)
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+            self.assertEqual("This is a test post", resp.get_json()["body"])
+
+            resp = c.get("/api/comments/get/user/comments/post/1", headers=headers)
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+            self.assertEqual(1, len(resp.get_json()["comments"]))
+
+            resp = c.get("/api/users/get/user/profile/test", headers=headers)
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+
+    def test_sync_fallback_does_not_block_the_loop(self):
+        async_db = AsyncDatabase(None, self.app.event_loop)
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+
+        event.listen(db.engine, "before_cursor_execute", record_thread)
+
+        try:
+            result = self.app.event_loop.async_to_sync(async_db.execute)(select(1))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record_thread)
+
+        self.assertEqual(1, result.scalar())
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual("flask-api-event-loop", threads[0])
+
+    def test_asgi_serves_requests_concurrently(self):
+        asgi_app = create_asgi_app(TestConfig)
+
+        @asgi_app.wsgi_application.get("/slow")
+        def slow():
+            time.sleep(0.5)
+            return {}
+
+        @asgi_app.wsgi_application.get("/fast")
+        def fast():
+            return {}
+
+        async def get(path):
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": b"",
+                "headers": [],
+                "http_version": "1.1",
+            }
+            await asgi_app(scope, receive, send)
+
+            return messages[0]["status"]
+
+        async def main():
+            return await asyncio.gather(*(get("/slow") for _ in range(4)))
+
+        # Without Redis the first request switches the rate limiter to its in-memory
+        # fallback, requests racing that switch would fail
+        asyncio.run(get("/fast"))
+
+        start = time.monotonic()
+        statuses = asyncio.run(main())
+
+        self.assertEqual([200] * 4, statuses)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_asgi_closes_streams_of_disconnected_clients(self):
+        asgi_app = create_asgi_app(TestConfig)
+        closed = threading.Event()
+
+        @asgi_app.wsgi_application.get("/stream")
+        def endless_stream():
+            def generate():
+                while True:
+                    time.sleep(0.01)
+                    yield ": heartbeat\n\n"
+
+            response = Response(generate(), mimetype="text/event-stream")
+            response.call_on_close(closed.set)
+
+            return response
+
+        async def main():
+            messages = []
+            sent = asyncio.Event()
+            requested = False
+
+            async def receive():
+                nonlocal requested
+
+                if not requested:
+                    requested = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+
+                await sent.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                messages.append(message)
+
+                if message.get("body"):
+                    sent.set()
+
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": "/stream",
+                "query_string": b"",
+                "headers": [],
+                "http_version": "1.1",
+            }
+            await asyncio.wait_for(asgi_app(scope, receive, send), 5)
+
+            return messages
+
+        messages = asyncio.run(main())
+
+        self.assertEqual(200, messages[0]["status"])
+        self.assertTrue(closed.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
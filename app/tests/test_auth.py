@@ -1,6 +1,24 @@
+import os
+import signal
+import time
 import unittest
+from datetime import datetime, timedelta
+
 from app import create_app, db
-from app.models import Users
+from app.helpers.password_helpers import PasswordHasher
+from app.helpers.revocation_helpers import (
+    BloomFilter,
+    RevokedTokenStore,
+    remove_old_tokens,
+    schedule_token_removal,
+    unschedule_token_removal,
+)
+from app.helpers.test_helpers import (
+    TEST_LOG_DIR,
+    capture_queries,
+    register_and_login_test_user,
+)
+from app.models import RevokedTokenModel, Users
 from config import Config
 
 
@@ -9,6 +27,91 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///"
     SECRET_KEY = "SQL-SECRET"
     JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class RevocationStore:
+    """
+    Stand-in for the Redis commands used by the revoked token store, shared by the
+    stores of several workers. Pipelines run their commands right away
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.stream = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = ex
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        entry_id = "{}-0".format(len(self.stream) + 1).encode()
+        self.stream.append(
+            (entry_id, {k.encode(): v.encode() for k, v in fields.items()})
+        )
+
+    def xrevrange(self, name, count=None):
+        return self.stream[::-1][:count]
+
+    def xread(self, streams):
+        last = int(next(iter(streams.values())).split(b"-")[0])
+        entries = self.stream[last:]
+
+        return [(b"revoked-tokens", entries)] if entries else []
+
+
+class ScheduledJob:
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+        self.status = "scheduled"
+
+    def get_id(self):
+        return self.id
+
+    def get_status(self):
+        return self.status
+
+    def delete(self):
+        self.queue.jobs.pop(self.id)
+
+
+class ScheduleQueue:
+    """
+    Stand-in for the RQ queue and the Redis commands used to schedule the periodic
+    token removal
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.keys = {}
+        self.enqueued = 0
+
+    def enqueue_in(self, delay, func, **kwargs):
+        self.enqueued += 1
+        job = ScheduledJob(self, "job-{}".format(self.enqueued))
+        self.jobs[job.id] = job
+        return job
+
+    def fetch_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def get(self, key):
+        return self.keys.get(key)
+
+    def set(self, key, value):
+        self.keys[key] = value.encode()
+
+    def delete(self, key):
+        self.keys.pop(key, None)
 
 
 class TestAuth(unittest.TestCase):
@@ -30,6 +133,71 @@ class TestAuth(unittest.TestCase):
         self.assertFalse(u.check_password("cat"))
         self.assertTrue(u.check_password("dog"))
 
+    def test_password_rehashed_on_login(self):
+        with self.app.test_client() as c:
+            register_and_login_test_user(c)
+
+            user = Users.query.filter_by(username="test").first()
+            self.assertTrue(user.password_hash.startswith("pbkdf2:sha256:600000$"))
+
+            self.app.password_hasher = PasswordHasher(
+                method="pbkdf2:sha256:1000", max_workers=0
+            )
+            resp = c.post(
+                "/api/auth/login", json={"username": "test", "password": "secret"}
+            )
+
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+            db.session.refresh(user)
+            self.assertTrue(user.password_hash.startswith("pbkdf2:sha256:1000$"))
+            self.assertTrue(user.check_password("secret"))
+
+    def test_short_method_names_do_not_rehash(self):
+        for method in ("pbkdf2", "pbkdf2:sha256", "scrypt"):
+            hasher = PasswordHasher(method=method, max_workers=0)
+
+            self.assertFalse(hasher.needs_rehash(hasher.hash("secret")), msg=method)
+            self.assertTrue(hasher.needs_rehash("pbkdf2:sha256:1000$salt$hash"))
+
+    def test_password_hashing_backpressure(self):
+        self.app.password_hasher = PasswordHasher(max_pending=1)
+        self.app.password_hasher._pending.acquire()
+
+        with self.app.test_client() as c:
+            resp = c.post(
+                "/api/auth/login", json={"username": "test", "password": "secret"}
+            )
+
+            self.assertEqual(401, resp.status_code, msg=resp.get_json())
+
+            resp = c.post(
+                "/api/auth/register",
+                json={
+                    "username": "test",
+                    "password": "secret",
+                    "first_name": "tim",
+                    "last_name": "apple",
+                    "email": "tim@test.com",
+                    "birthday": "1990-01-01",
+                },
+            )
+
+            self.assertEqual(503, resp.status_code, msg=resp.get_json())
+
+    def test_password_hasher_replaces_broken_pool(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", max_workers=1)
+
+        try:
+            password_hash = hasher.hash("secret")
+
+            for pid in list(hasher.pool._processes):
+                os.kill(pid, signal.SIGKILL)
+
+            self.assertTrue(hasher.verify(password_hash, "secret"))
+            self.assertTrue(hasher._pending.acquire(blocking=False))
+        finally:
+            hasher.close()
+
     def test_register(self):
         with self.app.test_client() as c:
             resp = c.post(
@@ -186,6 +354,120 @@ class TestAuth(unittest.TestCase):
             self.assertEqual(200, resp.status_code, msg=json_data)
             self.assertEqual("Successfully logged out", msg)
 
+    def test_revoked_token_is_rejected(self):
+        with self.app.test_client() as c:
+            c.post(
+                "/api/auth/register",
+                json={
+                    "username": "test",
+                    "password": "secret",
+                    "first_name": "tim",
+                    "last_name": "apple",
+                    "email": "tim@test.com",
+                    "birthday": "1990-01-01",
+                },
+            )
+
+            setup_resp = c.post(
+                "/api/auth/login", json={"username": "test", "password": "secret"}
+            )
+            setup_access_token = setup_resp.get_json()["access_token"]
+
+            c.delete(
+                "/api/auth/logout/token",
+                headers={"Authorization": "Bearer {}".format(setup_access_token)},
+            )
+
+            resp = c.get(
+                "/api/users/get/user/profile",
+                headers={"Authorization": "Bearer {}".format(setup_access_token)},
+            )
+
+            self.assertEqual(401, resp.status_code, msg=resp.get_json())
+
+    def test_revoked_token_store_with_redis(self):
+        connection = RevocationStore()
+        store = RevokedTokenStore(connection, capacity=100, sync_interval=60)
+        other_worker = RevokedTokenStore(connection, capacity=100, sync_interval=0.1)
+
+        # The first checks backfill the filters from the database
+        self.assertFalse(store.is_revoked("unknown"))
+        self.assertFalse(other_worker.is_revoked("unknown"))
+
+        store.revoke("revoked", datetime.utcnow() + timedelta(minutes=10))
+
+        self.assertIn(connection.keys["revoked-token:revoked"], (599, 600))
+
+        # Tokens missing from the filter are accepted without Redis or SQL, revoked
+        # ones are confirmed by their Redis key
+
+        with capture_queries(db.engine) as queries:
+            self.assertFalse(store.is_revoked("unknown"))
+            self.assertTrue(store.is_revoked("revoked"))
+
+        self.assertEqual([], queries)
+
+        # The other worker picks the revocation up from the stream once its sync
+        # interval passed
+        self.assertFalse(other_worker.is_revoked("revoked"))
+        time.sleep(0.1)
+
+        with capture_queries(db.engine) as queries:
+            self.assertTrue(other_worker.is_revoked("revoked"))
+
+        self.assertEqual([], queries)
+
+    def test_token_removal_is_scheduled_once(self):
+        queue = ScheduleQueue()
+        self.app.task_queue = self.app.redis = queue
+
+        self.assertEqual("job-1", schedule_token_removal(days=5))
+        self.assertIsNone(schedule_token_removal(days=5))
+
+        # The run schedules its successor, a run of an older chain does not
+        queue.jobs["job-1"].status = "started"
+        self.assertEqual("job-2", schedule_token_removal(after="job-1", days=5))
+        self.assertIsNone(schedule_token_removal(after="job-1", days=5))
+
+        self.assertTrue(unschedule_token_removal())
+        self.assertNotIn("job-2", queue.jobs)
+        self.assertIsNone(schedule_token_removal(after="job-2", days=5))
+        self.assertFalse(unschedule_token_removal())
+
+        # A chain whose last run failed can be started again
+        self.assertEqual("job-3", schedule_token_removal(days=5))
+        queue.jobs["job-3"].status = "failed"
+        self.assertEqual("job-4", schedule_token_removal(days=5))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        jtis = ["jti-{}".format(i) for i in range(1000)]
+
+        for jti in jtis:
+            bloom.add(jti)
+
+        self.assertTrue(all(jti in bloom for jti in jtis))
+        self.assertTrue(bloom.saturated)
+
+    def test_remove_old_tokens(self):
+        now = datetime.utcnow()
+
+        for i in range(7):
+            db.session.add(
+                RevokedTokenModel(
+                    jti=str(i),
+                    date_revoked=now - timedelta(days=10 if i < 5 else 0),
+                    expires=now - timedelta(minutes=1),
+                )
+            )
+
+        db.session.commit()
+
+        self.assertEqual(5, remove_old_tokens(5, dry_run=True))
+        self.assertEqual(5, remove_old_tokens(5, chunk_size=2))
+        self.assertEqual(2, RevokedTokenModel.query.count())
+        self.assertEqual(2, remove_old_tokens(5, include_expired=True))
+
 
 if __name__ == "__main__":
     unittest.main()
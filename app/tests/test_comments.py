@@ -2,7 +2,9 @@ import unittest
 
 from flask import json
 from app import create_app, db
-from app.helpers.test_helpers import register_and_login_test_user
+from app.helpers.counter_helpers import rebuild_counters
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from app.models import Posts, Users
 from config import Config
 
 
@@ -11,6 +13,7 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///"
     SECRET_KEY = "SQL-SECRET"
     JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
 
 
 class TestComments(unittest.TestCase):
@@ -54,6 +57,35 @@ class TestComments(unittest.TestCase):
 
             self.assertEqual(200, resp.status_code, msg=json_data)
 
+    def test_get_user_comments_streamed(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            c.post(
+                "/api/posts/post/user/submit/post",
+                headers=headers,
+                json={"body": "This is a test post"},
+            )
+
+            for i in range(2):
+                c.post(
+                    "/api/comments/post/user/submit/comment",
+                    headers=headers,
+                    json={"body": "Test comment {}".format(i), "post_id": 1},
+                )
+
+            resp = c.get(
+                "/api/comments/get/user/comments/post/1?stream=ndjson", headers=headers
+            )
+            lines = resp.get_data(as_text=True).splitlines()
+
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual(
+                ["Test comment 1", "Test comment 0"],
+                [json.loads(line)["body"] for line in lines],
+            )
+
     def test_submit_user_comment(self):
         with self.app.test_client() as c:
             setup_access_token = register_and_login_test_user(c)
@@ -107,6 +139,42 @@ class TestComments(unittest.TestCase):
 
             self.assertEqual(201, resp.status_code, msg=json_data)
 
+    def test_comment_and_post_counters(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for _ in range(2):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "This is a test post"},
+                )
+                c.post(
+                    "/api/comments/post/user/submit/comment",
+                    headers=headers,
+                    json={"body": "This is a test comment", "post_id": 1},
+                )
+
+            c.delete("/api/comments/delete/user/comment/1", headers=headers)
+            c.delete("/api/posts/delete/user/post/2", headers=headers)
+
+            user = c.get("/api/users/get/user/profile", headers=headers).get_json()
+            post = c.get("/api/posts/get/user/post/1", headers=headers).get_json()
+
+            self.assertEqual((1, 1), (user["post_count"], user["comment_count"]))
+            self.assertEqual(1, post["comment_count"])
+
+        db.session.execute(db.update(Users).values(post_count=5, comment_count=0))
+        db.session.execute(db.update(Posts).values(comment_count=7))
+        db.session.commit()
+
+        self.assertEqual((1, 1), rebuild_counters())
+
+        user = db.session.get(Users, 1)
+        self.assertEqual((1, 1), (user.post_count, user.comment_count))
+        self.assertEqual(1, db.session.get(Posts, 1).comment_count)
+
     def test_get_user_comments_async(self):
         with self.app.test_client() as c:
             setup_access_token = register_and_login_test_user(c)
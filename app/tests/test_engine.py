@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import text
+from app import create_app, db
+from app.helpers.engine_helpers import ENGINE_PROFILES, engine_options
+from app.helpers.test_helpers import TEST_LOG_DIR
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    DATABASE_ENGINE_PROFILE = "high-concurrency"
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+
+        config_class = type(
+            "FileTestConfig",
+            (TestConfig,),
+            {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + self.db_path},
+        )
+
+        self.app = create_app(config_class)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.app_context.pop()
+
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_engine_options(self):
+        profile = ENGINE_PROFILES["high-concurrency"]
+
+        self.assertEqual(20, db.engine.pool.size())
+        self.assertEqual(
+            1200, self.app.config["SQLALCHEMY_ENGINE_OPTIONS"]["query_cache_size"]
+        )
+        self.assertNotIn("pool_size", engine_options(profile, "sqlite:///"))
+        self.assertEqual(
+            30, engine_options(profile, "postgresql://db/app")["max_overflow"]
+        )
+
+    def test_sqlite_pragmas(self):
+        expected = {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 15000}
+
+        with db.engine.connect() as connection:
+            for name, value in expected.items():
+                pragma = connection.execute(text("PRAGMA {}".format(name))).scalar()
+                self.assertEqual(value, pragma, msg=name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from app import create_app, db
 from app.models import Users
+from app.helpers.test_helpers import TEST_LOG_DIR
 from config import Config
 
 
@@ -9,6 +10,7 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///"
     SECRET_KEY = "SQL-SECRET"
     JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
 
 
 class TestAuth(unittest.TestCase):
@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime
+
+from app import create_app
+from app.json_provider import orjson
+from app.helpers.test_helpers import TEST_LOG_DIR
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    JSON_ENGINE = "json"
+    JSON_SORT_KEYS = False
+
+
+class OrjsonTestConfig(TestConfig):
+    JSON_ENGINE = "orjson"
+
+
+class TestJSONProvider(unittest.TestCase):
+    def assert_provider(self, config_class, engine):
+        app = create_app(config_class)
+
+        with app.app_context():
+            self.assertEqual(engine, app.json.engine)
+
+            data = {"b": datetime(2020, 1, 2, 3, 4, 5, 6), "a": "é"}
+            resp = app.json.response(data)
+
+            self.assertEqual(
+                '{"b":"2020-01-02T03:04:05.000006","a":"é"}\n',
+                resp.get_data(as_text=True),
+            )
+            self.assertEqual({"a": [1, None]}, app.json.loads(b'{"a": [1, null]}'))
+
+    def test_stdlib_engine(self):
+        self.assert_provider(TestConfig, "json")
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_engine(self):
+        self.assert_provider(OrjsonTestConfig, "orjson")
+
+    def test_keys_sorted_by_default(self):
+        config_class = type(
+            "SortedTestConfig", (TestConfig,), {"JSON_SORT_KEYS": Config.JSON_SORT_KEYS}
+        )
+        app = create_app(config_class)
+
+        with app.app_context():
+            resp = app.json.response({"b": 1, "a": 2})
+
+            self.assertEqual('{"a":2,"b":1}\n', resp.get_data(as_text=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
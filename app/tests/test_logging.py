@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+from app import create_app, db
+from app.helpers.logging_helpers import BackgroundLogHandler
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_INFO_SAMPLE_RATE = 0.0
+
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.config_class = type(
+            "LogTestConfig", (TestConfig,), {"LOG_DIR": self.log_dir.name}
+        )
+
+        self.app = create_app(self.config_class)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.log_dir.cleanup()
+
+    def read_log(self) -> list:
+        for handler in self.app.logger.handlers:
+            handler.close()
+
+        self.app.logger.handlers.clear()
+
+        with open(os.path.join(self.log_dir.name, "flask_api.log")) as f:
+            return [json.loads(line) for line in f]
+
+    def test_json_lines_with_request_id(self):
+        @self.app.get("/log-test")
+        def log_test():
+            self.app.logger.info("Sampled out")
+            self.app.logger.warning("Kept %s", "warning")
+            return {}
+
+        with self.app.test_client() as c:
+            resp = c.get("/log-test", headers={"X-Request-ID": "abc-123"})
+            self.assertEqual("abc-123", resp.headers["X-Request-ID"])
+
+            resp = c.get("/log-test", headers={"X-Request-ID": "bad id"})
+            generated_id = resp.headers["X-Request-ID"]
+            self.assertRegex(generated_id, r"^[0-9a-f]{32}$")
+
+        entries = self.read_log()
+
+        self.assertEqual(
+            ["Kept warning", "Kept warning"], [e["message"] for e in entries]
+        )
+        self.assertEqual(["abc-123", generated_id], [e["request_id"] for e in entries])
+        self.assertEqual("WARNING", entries[0]["level"])
+
+    def test_apps_share_one_log_handler(self):
+        app = create_app(self.config_class)
+
+        handlers = [
+            handler
+            for handler in app.logger.handlers
+            if isinstance(handler, BackgroundLogHandler)
+        ]
+        self.assertEqual(1, len(handlers))
+
+        app.logger.warning("Logged once")
+
+        self.assertEqual(["Logged once"], [e["message"] for e in self.read_log()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    METRICS_ENABLED = True
+    SERVER_TIMING_ENABLED = True
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_server_timing_and_metrics(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+
+            resp = c.get(
+                "/api/posts/get/user/posts",
+                headers={"Authorization": "Bearer {}".format(setup_access_token)},
+            )
+
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+            self.assertRegex(
+                resp.headers["Server-Timing"],
+                r'^app;dur=[\d.]+, sql;dur=[\d.]+;desc="[1-9]\d* queries", '
+                r'redis;dur=[\d.]+;desc="\d+ calls"$',
+            )
+
+            resp = c.get("/metrics")
+            body = resp.get_data(as_text=True)
+
+            self.assertEqual(200, resp.status_code)
+            self.assertTrue(resp.content_type.startswith("text/plain"))
+            self.assertIn(
+                'http_request_duration_seconds_count{endpoint="/api/posts/get/user/posts"'
+                ',method="GET",status="200"}',
+                body,
+            )
+            self.assertIn(
+                'sql_statements_total{endpoint="/api/posts/get/user/posts"}', body
+            )
+
+    def test_failed_statement_and_default_server_timing(self):
+        with db.engine.connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+
+            self.assertEqual(1, connection.execute(text("SELECT 1")).scalar())
+            self.assertNotIn("statement_start", connection.info)
+
+        self.app.config["SERVER_TIMING_ENABLED"] = None
+
+        with self.app.test_client() as c:
+            self.assertNotIn("Server-Timing", c.get("/metrics").headers)
+
+    def test_metrics_disabled_by_default_and_token(self):
+        app = create_app(
+            type(
+                "DefaultMetricsConfig",
+                (TestConfig,),
+                {"METRICS_ENABLED": Config.METRICS_ENABLED},
+            )
+        )
+
+        with app.test_client() as c:
+            self.assertEqual(404, c.get("/metrics").status_code)
+
+        self.app.config["METRICS_TOKEN"] = "scrape-secret"
+
+        with self.app.test_client() as c:
+            self.assertEqual(401, c.get("/metrics").status_code)
+            self.assertEqual(
+                401,
+                c.get(
+                    "/metrics", headers={"Authorization": "Bearer wrong"}
+                ).status_code,
+            )
+            self.assertEqual(
+                200,
+                c.get(
+                    "/metrics", headers={"Authorization": "Bearer scrape-secret"}
+                ).status_code,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import json
 import unittest
 from app import create_app, db
-from app.helpers.test_helpers import register_and_login_test_user
+from app.helpers.test_helpers import (
+    TEST_LOG_DIR,
+    register_and_login_test_user,
+    start_stub_upstream,
+)
 from config import Config
 
 
@@ -9,6 +14,7 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///"
     SECRET_KEY = "SQL-SECRET"
     JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
 
 
 class TestPosts(unittest.TestCase):
@@ -44,6 +50,74 @@ class TestPosts(unittest.TestCase):
 
             self.assertEqual(200, resp.status_code, msg=json_data)
 
+    def test_get_user_posts_paginated(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for i in range(3):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "Test post {}".format(i)},
+                )
+
+            resp = c.get("api/posts/get/user/posts?limit=2", headers=headers)
+            json_data = resp.get_json()
+
+            self.assertEqual(200, resp.status_code, msg=json_data)
+            self.assertEqual([3, 2], [post["id"] for post in json_data["posts"]])
+            self.assertTrue(json_data["next"])
+
+            resp = c.get(
+                "api/posts/get/user/posts?limit=2&cursor={}".format(json_data["next"]),
+                headers=headers,
+            )
+            json_data = resp.get_json()
+
+            self.assertEqual([1], [post["id"] for post in json_data["posts"]])
+            self.assertIsNone(json_data["next"])
+
+            # Pages of selected fields still carry a cursor
+            resp = c.get(
+                "api/posts/get/user/posts?limit=2&fields=body", headers=headers
+            )
+            json_data = resp.get_json()
+
+            self.assertEqual(
+                [{"body": "Test post 2"}, {"body": "Test post 1"}], json_data["posts"]
+            )
+            self.assertTrue(json_data["next"])
+
+            resp = c.get("api/posts/get/user/posts?cursor=xxx", headers=headers)
+
+            self.assertEqual(400, resp.status_code, msg=resp.get_json())
+
+    def test_get_user_posts_streamed(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for i in range(3):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "Test post {}".format(i)},
+                )
+
+            resp = c.get("api/posts/get/user/posts?stream=json", headers=headers)
+            json_data = resp.get_json()
+
+            self.assertEqual(200, resp.status_code, msg=json_data)
+            self.assertEqual([3, 2, 1], [post["id"] for post in json_data])
+
+            resp = c.get("api/posts/get/user/posts?stream=ndjson", headers=headers)
+            lines = resp.get_data(as_text=True).splitlines()
+
+            self.assertEqual("application/x-ndjson", resp.mimetype)
+            self.assertEqual(3, len(lines))
+            self.assertEqual(3, json.loads(lines[0])["id"])
+
     def test_get_user_post_by_id(self):
         with self.app.test_client() as c:
             setup_access_token = register_and_login_test_user(c)
@@ -115,6 +189,34 @@ class TestPosts(unittest.TestCase):
 
             self.assertEqual(200, resp.status_code, msg=json_data)
 
+    def test_get_user_posts_async_from_stub_upstream(self):
+        server, url, requests = start_stub_upstream([{"id": 1, "title": "stub"}])
+        self.app.config["EXTERNAL_API_URL"] = url
+
+        try:
+            with self.app.test_client() as c:
+                setup_access_token = register_and_login_test_user(c)
+
+                for _ in range(2):
+                    resp = c.get(
+                        "/api/posts/get/user/posts/async",
+                        headers={
+                            "Authorization": "Bearer {}".format(setup_access_token)
+                        },
+                    )
+
+                    json_data = resp.get_json()
+
+                    self.assertEqual(200, resp.status_code, msg=json_data)
+                    self.assertEqual(5, len(json_data["posts"]))
+
+            # Five identical URLs on two requests cost a single upstream call
+            self.assertEqual(["/posts"], requests)
+
+        finally:
+            self.app.http_client.close()
+            server.shutdown()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from app import create_app, db
+from app.helpers.query_budget_helpers import QueryBudgetExceeded, query_budget
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from app.models import Posts
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    QUERY_BUDGET_MODE = "raise"
+
+
+class TestQueryBudgets(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_routes_within_budget(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for _ in range(3):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "This is a test post"},
+                )
+                c.post(
+                    "/api/comments/post/user/submit/comment",
+                    headers=headers,
+                    json={"body": "This is a test comment", "post_id": 1},
+                )
+
+            for url in (
+                "/api/posts/get/user/posts",
+                "/api/posts/get/user/post/1",
+                "/api/comments/get/user/comments/post/1",
+                "/api/users/get/user/profile",
+                "/api/users/get/user/profile/test",
+                "/api/tasks/get/active-background-tasks",
+                "/api/tasks/get/finished-background-tasks",
+            ):
+                resp = c.get(url, headers=headers)
+                self.assertEqual(200, resp.status_code, msg=url)
+
+            resp = c.delete("/api/comments/delete/user/comment/1", headers=headers)
+            self.assertEqual(201, resp.status_code, msg=resp.get_json())
+
+            resp = c.delete("/api/posts/delete/user/post/2", headers=headers)
+            self.assertEqual(201, resp.status_code, msg=resp.get_json())
+
+    def test_repeated_statement_fails_request(self):
+        for i in range(3):
+            db.session.add(Posts(body="Post {}".format(i)))
+        db.session.commit()
+
+        @query_budget(10)
+        def n_plus_one():
+            return {"bodies": [db.session.get(Posts, i).body for i in (1, 2, 3)]}
+
+        self.app.add_url_rule("/n-plus-one", view_func=n_plus_one)
+        db.session.expunge_all()
+
+        with self.app.test_client() as c:
+            with self.assertRaisesRegex(QueryBudgetExceeded, "N\\+1"):
+                c.get("/n-plus-one")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from app import create_app, db
+from app.helpers.test_helpers import (
+    TEST_LOG_DIR,
+    capture_queries,
+    find_full_table_scans,
+    register_and_login_test_user,
+)
+from app.models import Tasks
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_routes_do_not_scan_full_tables(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for i in range(3):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "Test post {}".format(i)},
+                )
+                c.post(
+                    "/api/comments/post/user/submit/comment",
+                    headers=headers,
+                    json={"body": "Test comment {}".format(i), "post_id": 1},
+                )
+
+            db.session.add(Tasks(task_id="1", name="count_seconds", user_id=1))
+            db.session.commit()
+
+            with capture_queries(db.engine) as queries:
+                next_cursor = c.get(
+                    "/api/posts/get/user/posts?limit=1", headers=headers
+                ).get_json()["next"]
+                c.get(
+                    "/api/posts/get/user/posts?limit=1&cursor={}".format(next_cursor),
+                    headers=headers,
+                )
+                c.get("/api/posts/get/user/post/1", headers=headers)
+                c.get("/api/comments/get/user/comments/post/1", headers=headers)
+                c.get("/api/users/get/user/profile/test", headers=headers)
+                c.get("/api/tasks/get/active-background-tasks", headers=headers)
+                c.get("/api/tasks/get/finished-background-tasks", headers=headers)
+                c.post(
+                    "/api/auth/login", json={"username": "test", "password": "secret"}
+                )
+                c.delete("/api/auth/logout/token", headers=headers)
+
+            self.assertTrue(queries)
+            self.assertEqual([], find_full_table_scans(db.engine, queries))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from limits import parse
+from limits.storage import MemoryStorage
+from app import create_app, db
+from app.helpers.rate_limit_helpers import PrefetchingRateLimiter
+from app.helpers.test_helpers import TEST_LOG_DIR
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    RATELIMIT_STORAGE_URI = "memory://"
+    RATELIMIT_STRATEGY = "moving-window-prefetch"
+    RATELIMIT_AUTH = "2 per minute"
+
+
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_prefetching_limiter(self):
+        storage = MemoryStorage()
+        rate_limiter = PrefetchingRateLimiter(storage, batch_size=3)
+        item = parse("30 per minute")
+
+        results = [rate_limiter.hit(item, "client") for _ in range(31)]
+
+        self.assertEqual([True] * 30 + [False], results)
+        self.assertFalse(rate_limiter.test(item, "client"))
+        self.assertEqual(
+            30, storage.get_moving_window(item.key_for("client"), 30, 60)[1]
+        )
+
+        # Batches are capped to a tenth of the limit
+        item = parse("20 per minute")
+        rate_limiter.hit(item, "other")
+
+        self.assertEqual(1, rate_limiter._buckets[item.key_for("other")][0])
+
+    def test_auth_limit(self):
+        with self.app.test_client() as c:
+            payload = {"username": "test", "password": "secret"}
+            statuses = [
+                c.post("/api/auth/login", json=payload).status_code for _ in range(3)
+            ]
+
+            self.assertEqual([401, 401, 429], statuses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import threading
+import unittest
+from redis import Redis
+from app import create_app, db
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class MarkerStore:
+    """
+    Stand-in for the Redis commands used by the replica router
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.threads = set()
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        self.threads.add(threading.current_thread().name)
+        return int(key in self.keys)
+
+
+class TestReplicas(unittest.TestCase):
+    def setUp(self):
+        # The replica is a second SQLite file which never receives the writes, so
+        # reads served by it stand out
+        self.db_paths = []
+
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            self.db_paths.append(path)
+
+        config_class = type(
+            "ReplicaTestConfig",
+            (TestConfig,),
+            {
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///" + self.db_paths[0],
+                "SQLALCHEMY_BINDS": {"replica_0": "sqlite:///" + self.db_paths[1]},
+            },
+        )
+
+        self.app = create_app(config_class)
+        self.app.replica_router.redis = MarkerStore()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.metadata.create_all(db.engines["replica_0"])
+
+    def tearDown(self):
+        db.session.remove()
+
+        for engine in db.engines.values():
+            engine.dispose()
+
+        self.app_context.pop()
+
+        # Flask-SQLAlchemy keeps a metadata per bind key on the shared extension, drop
+        # it so apps created by the other tests do not look for the replica
+        db.metadatas.pop("replica_0", None)
+
+        for path in self.db_paths:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def test_reads_pinned_to_primary_after_write(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            c.post(
+                "/api/posts/post/user/submit/post",
+                headers=headers,
+                json={"body": "This is a test post"},
+            )
+
+            self.assertEqual(
+                ["recent-write:1"], list(self.app.replica_router.redis.keys)
+            )
+
+            resp = c.get("/api/posts/get/user/post/1", headers=headers)
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+
+            # The async view chose its bind before it was handed to the event loop
+            self.assertNotIn(
+                "flask-api-event-loop", self.app.replica_router.redis.threads
+            )
+
+            # Once the marker expired reads go to the replica which lacks the post
+            self.app.replica_router.redis.keys.clear()
+
+            resp = c.get("/api/posts/get/user/post/1", headers=headers)
+            self.assertEqual(400, resp.status_code, msg=resp.get_json())
+
+            resp = c.get("/api/posts/get/user/posts", headers=headers)
+            self.assertEqual([], resp.get_json()["posts"])
+
+            # Without Redis the primary is used
+            self.app.replica_router.redis = Redis.from_url("redis://localhost:1")
+
+            resp = c.get("/api/posts/get/user/posts", headers=headers)
+            self.assertEqual(1, len(resp.get_json()["posts"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
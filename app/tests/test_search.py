@@ -0,0 +1,109 @@
+import unittest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import text
+from app import create_app, db
+from app.helpers.search_helpers import reindex
+from app.models import include_search_index, search_index_statements
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def search(self, c, headers, **params) -> dict:
+        resp = c.get(
+            "/api/search/posts-and-comments", headers=headers, query_string=params
+        )
+        self.assertEqual(200, resp.status_code, msg=resp.get_json())
+        return resp.get_json()
+
+    def test_search_posts_and_comments(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for body in (
+                "Flask makes APIs simple",
+                "Cooking pasta tonight",
+                "Flask APIs with flask extensions",
+            ):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": body},
+                )
+
+            c.post(
+                "/api/comments/post/user/submit/comment",
+                headers=headers,
+                json={"body": "Great flask API tips", "post_id": 1},
+            )
+            c.delete("/api/posts/delete/user/post/1", headers=headers)
+
+            data = self.search(c, headers, q="flask api")
+            self.assertEqual(
+                [("post", 3), ("comment", 1)],
+                [(r["type"], r["id"]) for r in data["results"]],
+            )
+
+            # Operator syntax is ignored instead of breaking the query
+            first = self.search(c, headers, q='flask" (', limit=1)
+            self.assertEqual(1, len(first["results"]))
+
+            second = self.search(c, headers, q="flask", limit=1, cursor=first["next"])
+            self.assertEqual(1, len(second["results"]))
+            self.assertNotEqual(first["results"], second["results"])
+
+            resp = c.get("/api/search/posts-and-comments?q=%20", headers=headers)
+            self.assertEqual(400, resp.status_code)
+
+            self.assertEqual(3, reindex())
+            self.assertEqual(2, len(self.search(c, headers, q="flask")["results"]))
+
+    def test_search_index_outside_create_all(self):
+        # Databases set up by migrations only get the index from its statements
+        for statement in search_index_statements("sqlite", drop=True):
+            db.session.execute(text(statement))
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            c.post(
+                "/api/posts/post/user/submit/post",
+                headers=headers,
+                json={"body": "Flask makes APIs simple"},
+            )
+
+            self.assertEqual(1, reindex())
+            self.assertEqual(1, len(self.search(c, headers, q="flask")["results"]))
+
+        # Autogenerated migrations leave the unmapped index alone
+        with db.engine.connect() as connection:
+            context = MigrationContext.configure(
+                connection, opts={"include_object": include_search_index}
+            )
+            self.assertEqual([], compare_metadata(context, db.metadata))
+
+
+if __name__ == "__main__":
+    unittest.main()
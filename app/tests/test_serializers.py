@@ -0,0 +1,105 @@
+import unittest
+from datetime import datetime
+
+from app import create_app, db
+from app.models import Comments, Posts, Tasks, Users
+from app.schemas import CommentsSchema, PostsSchema, TasksSchema, UsersSchema
+from app.serializers import compile_schema
+from app.helpers.test_helpers import TEST_LOG_DIR
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class TestSerializers(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        user = Users(
+            username="test",
+            first_name="tim",
+            last_name="apple",
+            email="tim@test.com",
+            password_hash="hash",
+            birthday=datetime(1990, 1, 1),
+        )
+        post = Posts(body="This is a test post", user=user)
+        db.session.add_all(
+            [
+                user,
+                post,
+                Posts(body=None, user=user),
+                Comments(body="This is a test comment", post=post, user=user),
+                Comments(body="", timestamp=None, post=post, user=user),
+                Tasks(task_id="1", name="count_seconds", user=user),
+                Tasks(task_id="2", description="Counting", user=user, complete=True),
+            ]
+        )
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assert_parity(self, schema, model):
+        serializer = compile_schema(schema)
+        objects = model.query.all()
+        rows = db.session.execute(serializer.select()).all()
+        expected = schema.dump(objects, many=True)
+
+        self.assertEqual(expected, serializer.dump(objects, many=True))
+        self.assertEqual(expected, serializer.dump(rows, many=True))
+        self.assertEqual(expected[0], serializer.dump(objects[0], many=False))
+        self.assertEqual(expected[0], serializer.dump(rows[0], many=False))
+        self.assertEqual([], serializer.dump([], many=True))
+
+    def test_users_parity(self):
+        self.assert_parity(UsersSchema(), Users)
+        self.assert_parity(UsersSchema(exclude=("email", "password_hash")), Users)
+        self.assert_parity(UsersSchema(only=("id", "username")), Users)
+
+    def test_posts_parity(self):
+        self.assert_parity(PostsSchema(), Posts)
+
+    def test_comments_parity(self):
+        self.assert_parity(CommentsSchema(), Comments)
+
+    def test_tasks_parity(self):
+        self.assert_parity(TasksSchema(), Tasks)
+
+    def test_excluded_fields_are_not_selected(self):
+        serializer = compile_schema(UsersSchema(exclude=("email", "password_hash")))
+
+        columns = [column.key for column in serializer.columns]
+
+        self.assertNotIn("email", columns)
+        self.assertNotIn("password_hash", columns)
+
+    def test_narrowed_schema(self):
+        serializer = compile_schema(
+            UsersSchema(many=True, exclude=("email", "password_hash"))
+        )
+        narrowed = serializer.only(["username", "id"])
+        rows = db.session.execute(narrowed.select(Users.join_date)).all()
+
+        self.assertEqual(["id", "username"], [c.key for c in narrowed.columns])
+        self.assertEqual([{"id": 1, "username": "test"}], narrowed.dump(rows))
+        self.assertEqual(["id", "username"], list(narrowed.dump(rows)[0]))
+        self.assertIs(narrowed, serializer.only(["id", "username"]))
+
+        with self.assertRaises(ValueError):
+            serializer.only(["id", "email"])
+
+
+if __name__ == "__main__":
+    unittest.main()
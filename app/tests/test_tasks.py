@@ -0,0 +1,300 @@
+import json
+import unittest
+
+from redis import Redis
+from redis.exceptions import ConnectionError
+
+from app import create_app, db
+from app.helpers.task_helpers import (
+    ProgressReporter,
+    progress_channel,
+    progress_latest_key,
+    publish_task_progress,
+)
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from app.models import Tasks
+from app.tasks.routes import format_event
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    TASK_PROGRESS_HEARTBEAT = 5
+
+
+class ProgressStore:
+    """
+    Stand-in for the Redis commands used by the progress stream. The pub/sub returns
+    the queued messages in order, None stands for a heartbeat timeout, and drops the
+    connection once the queue is empty. Pipelines run their commands right away
+    """
+
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.values = {}
+        self.published = []
+        self.channels = []
+        self.timeouts = []
+        self.closed = False
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return self
+
+    def subscribe(self, channel):
+        self.channels.append(channel)
+
+    def get_message(self, timeout=0.0):
+        self.timeouts.append(timeout)
+
+        if not self.messages:
+            raise ConnectionError("Connection closed")
+
+        message = self.messages.pop(0)
+
+        if message is None:
+            return None
+
+        return {"type": "message", "data": json.dumps(message)}
+
+    def close(self):
+        self.closed = True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+    def hset(self, key, field, value):
+        self.values.setdefault(key, {})[field.encode()] = value.encode()
+
+    def hgetall(self, key):
+        return dict(self.values.get(key, {}))
+
+    def expire(self, key, seconds):
+        pass
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+
+class TestTasks(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_active_background_tasks(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+
+            db.session.add(
+                Tasks(task_id="missing-job", name="count_seconds", user_id=1)
+            )
+            db.session.add(Tasks(task_id="done", user_id=1, complete=True))
+            db.session.commit()
+
+            resp = c.get(
+                "/api/tasks/get/active-background-tasks",
+                headers={"Authorization": "Bearer {}".format(setup_access_token)},
+            )
+
+            json_data = resp.get_json()
+
+            self.assertEqual(200, resp.status_code, msg=json_data)
+            self.assertEqual(1, len(json_data["tasks"]))
+            self.assertEqual("missing-job", json_data["tasks"][0]["task_id"])
+            self.assertIn("progress", json_data["tasks"][0])
+            self.assertIn("status", json_data["tasks"][0])
+
+    def test_finished_background_tasks(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+
+            db.session.add(Tasks(task_id="done", user_id=1, complete=True))
+            db.session.commit()
+
+            resp = c.get(
+                "/api/tasks/get/finished-background-tasks",
+                headers={"Authorization": "Bearer {}".format(setup_access_token)},
+            )
+
+            json_data = resp.get_json()
+
+            self.assertEqual(200, resp.status_code, msg=json_data)
+            self.assertEqual(["done"], [task["task_id"] for task in json_data["tasks"]])
+
+    def test_background_task_progress_stream_without_redis(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            # Point the app at a port nothing listens on
+            self.app.redis = Redis.from_url("redis://localhost:1")
+
+            resp = c.get(
+                "/api/tasks/stream/background-task-progress",
+                headers={"Authorization": "Bearer {}".format(setup_access_token)},
+            )
+
+            json_data = resp.get_json()
+
+            self.assertEqual(503, resp.status_code, msg=json_data)
+            self.assertTrue(self.app.progress_streams.acquire(blocking=False))
+
+    def read_stream(self, c, headers):
+        resp = c.get("/api/tasks/stream/background-task-progress", headers=headers)
+        self.assertEqual(200, resp.status_code, msg=resp.get_data(as_text=True))
+        self.assertEqual("text/event-stream", resp.mimetype)
+        body = resp.get_data(as_text=True)
+        resp.close()
+
+        return body
+
+    def test_background_task_progress_stream(self):
+        store = ProgressStore(
+            [{"id": 1, "task_id": "job", "progress": 10}, None, None]
+            + [{"id": 2, "task_id": "job", "progress": 60}]
+        )
+        self.app.redis = store
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            self.assertEqual(
+                "retry: 3000\n\n"
+                'id: 1\nevent: progress\ndata: {"task_id": "job", "progress": 10}\n\n'
+                ": heartbeat\n\n"
+                ": heartbeat\n\n"
+                'id: 2\nevent: progress\ndata: {"task_id": "job", "progress": 60}\n\n',
+                self.read_stream(c, headers),
+            )
+
+        self.assertEqual([progress_channel(1)], store.channels)
+        self.assertEqual([5] * 5, store.timeouts)
+        self.assertTrue(store.closed)
+        self.assertTrue(self.app.progress_streams.acquire(blocking=False))
+
+    def test_background_task_progress_stream_replay(self):
+        store = ProgressStore()
+        self.app.redis = store
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            publish_task_progress(1, "done", 40)
+            publish_task_progress(1, "running", 10)
+
+            self.assertEqual(
+                [
+                    (progress_channel(1), {"id": 1, "task_id": "done", "progress": 40}),
+                    (
+                        progress_channel(1),
+                        {"id": 2, "task_id": "running", "progress": 10},
+                    ),
+                ],
+                store.published,
+            )
+
+            # Events published while the client was away, the first task completed
+            publish_task_progress(1, "done", 100)
+            publish_task_progress(1, "running", 60)
+
+            # A client which saw every event gets no replay
+            self.assertEqual(
+                "retry: 3000\n\n",
+                self.read_stream(c, {**headers, "Last-Event-ID": "4"}),
+            )
+
+            # Every task which changed since is sent with the current sequence
+            self.assertEqual(
+                "retry: 3000\n\n"
+                "id: 4\nevent: progress\n"
+                'data: {"task_id": "done", "progress": 100}\n\n'
+                "id: 4\nevent: progress\n"
+                'data: {"task_id": "running", "progress": 60}\n\n',
+                self.read_stream(c, {**headers, "Last-Event-ID": "2"}),
+            )
+
+            self.assertEqual(
+                "retry: 3000\n\n"
+                "id: 4\nevent: progress\n"
+                'data: {"task_id": "running", "progress": 60}\n\n',
+                self.read_stream(c, {**headers, "Last-Event-ID": "3"}),
+            )
+
+        self.assertEqual(
+            {b"done", b"running"}, set(store.values[progress_latest_key(1)])
+        )
+
+    def test_background_task_progress_stream_limit(self):
+        self.app.redis = ProgressStore()
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for _ in range(TestConfig.TASK_PROGRESS_MAX_STREAMS):
+                self.assertTrue(self.app.progress_streams.acquire(blocking=False))
+
+            resp = c.get("/api/tasks/stream/background-task-progress", headers=headers)
+            json_data = resp.get_json()
+
+            self.assertEqual(503, resp.status_code, msg=json_data)
+            self.assertEqual("Too many progress streams", json_data["msg"])
+
+            self.app.progress_streams.release()
+            self.assertEqual("retry: 3000\n\n", self.read_stream(c, headers))
+
+    def test_format_event(self):
+        self.assertEqual(
+            'id: 3\nevent: progress\ndata: {"progress": 50}\n\n',
+            format_event({"progress": 50}, "progress", 3),
+        )
+
+    def test_progress_reporter_coalesces_updates(self):
+        class Job:
+            def __init__(self):
+                self.meta = {}
+                self.saved = []
+
+            def get_id(self):
+                return "job"
+
+            def save_meta(self):
+                self.saved.append(self.meta["progress"])
+
+        db.session.add(Tasks(task_id="job", user_id=1))
+        db.session.commit()
+
+        with ProgressReporter(min_delta=10, min_interval=60) as reporter:
+            reporter.job = Job()
+
+            for progress in range(0, 100):
+                reporter.update(progress)
+
+        self.assertEqual(
+            [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100], reporter.job.saved
+        )
+        self.assertTrue(Tasks.query.filter_by(task_id="job").first().complete)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+from datetime import datetime
+from app import create_app, db
+from app.helpers.test_helpers import TEST_LOG_DIR, register_and_login_test_user
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///"
+    SECRET_KEY = "SQL-SECRET"
+    JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+    QUERY_BUDGET_MODE = "raise"
+    TIMELINE_MAX_LENGTH = 3
+
+
+class TimelineStore:
+    """
+    Stand-in for the Redis commands used by the timelines, pipelines run their
+    commands on execute
+    """
+
+    def __init__(self):
+        self.sets = {}
+        self.commands = []
+
+    def pipeline(self, transaction=True):
+        self.commands = []
+        return self
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command() for command in commands]
+
+    def register_script(self, source):
+        def add(keys, args, client=None):
+            def run():
+                timeline = self.sets.setdefault(keys[0], {})
+
+                for score, member in zip(args[2::2], args[3::2]):
+                    timeline[str(member)] = float(score)
+
+                newest = sorted(timeline.items(), key=lambda item: -item[1])
+                self.sets[keys[0]] = dict(newest[: args[0]])
+
+            if client is None:
+                return run()
+
+            client.commands.append(run)
+
+        return add
+
+    def zcard(self, key):
+        self.commands.append(lambda: len(self.sets.get(key, {})))
+
+    def zrevrangebyscore(self, key, max, min, start, num, withscores):
+        def run():
+            members = [
+                (member.encode(), score)
+                for member, score in self.sets.get(key, {}).items()
+                if max == "+inf" or score <= max
+            ]
+            return sorted(members, key=lambda m: -m[1])[start : start + num]
+
+        self.commands.append(run)
+
+    def zrem(self, key, member):
+        self.commands.append(lambda: self.sets.get(key, {}).pop(str(member), None))
+
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def read_timeline(self, c, headers, limit):
+        bodies, cursor = [], None
+
+        while True:
+            query = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            resp = c.get(
+                "/api/posts/get/user/timeline", headers=headers, query_string=query
+            )
+            self.assertEqual(200, resp.status_code, msg=resp.get_json())
+            bodies += [post["body"] for post in resp.get_json()["posts"]]
+            cursor = resp.get_json()["next"]
+
+            if not cursor:
+                return bodies
+
+    def test_timeline_without_redis(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            for i in range(3):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "Post {}".format(i)},
+                )
+
+            self.assertEqual(
+                ["Post 2", "Post 1", "Post 0"], self.read_timeline(c, headers, 2)
+            )
+
+    def test_timeline_fan_out_on_write(self):
+        self.app.timeline = type(self.app.timeline)(
+            TimelineStore(), max_length=3, ttl=60
+        )
+        store = self.app.timeline.redis
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            c.post(
+                "/api/posts/post/user/submit/post",
+                headers=headers,
+                json={"body": "Post 0"},
+            )
+
+            # A timeline built by pushes alone is partial, the first read fills it
+            self.assertEqual({"1"}, set(store.sets["timeline:1"]))
+            self.assertEqual(["Post 0"], self.read_timeline(c, headers, 2))
+            self.assertEqual({"0", "1"}, set(store.sets["timeline:1"]))
+
+            for i in range(1, 5):
+                c.post(
+                    "/api/posts/post/user/submit/post",
+                    headers=headers,
+                    json={"body": "Post {}".format(i)},
+                )
+
+            self.assertEqual({"3", "4", "5"}, set(store.sets["timeline:1"]))
+
+            c.delete("/api/posts/delete/user/post/4", headers=headers)
+            self.assertEqual({"3", "5"}, set(store.sets["timeline:1"]))
+
+            # Pages past the trimmed end of the cached timeline come from the database
+            self.assertEqual(
+                ["Post 4", "Post 2", "Post 1", "Post 0"],
+                self.read_timeline(c, headers, 1),
+            )
+
+    def test_fill_keeps_concurrent_pushes(self):
+        self.app.timeline = type(self.app.timeline)(
+            TimelineStore(), max_length=3, ttl=60
+        )
+        store = self.app.timeline.redis
+
+        with self.app.test_client() as c:
+            register_and_login_test_user(c)
+
+        # A post pushed between the database read of a fill and its write to Redis is
+        # not among the rows the fill read
+        self.app.timeline.push(1, 7, datetime.utcnow())
+        self.app.timeline.fill(1)
+
+        self.assertEqual({"0", "7"}, set(store.sets["timeline:1"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
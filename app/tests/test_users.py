@@ -1,6 +1,12 @@
 import unittest
 from app import create_app, db
-from app.helpers.test_helpers import register_and_login_test_user
+from app.helpers.test_helpers import (
+    TEST_LOG_DIR,
+    capture_queries,
+    register_and_login_test_user,
+)
+from app.helpers.user_cache_helpers import UserIdentityCache
+from app.models import Users
 from config import Config
 
 
@@ -9,6 +15,43 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///"
     SECRET_KEY = "SQL-SECRET"
     JWT_SECRET_KEY = "JWT-SECRET"
+    LOG_DIR = TEST_LOG_DIR
+
+
+class IdentityStore:
+    """
+    Stand-in for the Redis commands used by the user identity cache, pipelines run
+    their commands right away
+    """
+
+    def __init__(self):
+        self.keys = {}
+
+    def mget(self, *keys):
+        return [self.keys.get(key) for key in keys]
+
+    def register_script(self, source):
+        def set_if_generation(keys, args, client=None):
+            if self.keys.get(keys[1], b"0") == args[0]:
+                self.keys[keys[0]] = args[1].encode()
+
+        return set_if_generation
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def incr(self, key):
+        self.keys[key] = str(int(self.keys.get(key, b"0")) + 1).encode()
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.keys.pop(key, None)
 
 
 class TestUsers(unittest.TestCase):
@@ -49,6 +92,85 @@ class TestUsers(unittest.TestCase):
 
             self.assertEqual(200, resp.status_code, msg=json_data)
 
+    def test_get_user_fields(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            resp = c.get(
+                "/api/users/get/user/profile/test?fields=id,username", headers=headers
+            )
+            self.assertEqual({"id": 1, "username": "test"}, resp.get_json())
+
+            resp = c.get("/api/users/get/user/profile?fields=email", headers=headers)
+            self.assertEqual(400, resp.status_code)
+
+    def test_user_page_reflects_user_changes(self):
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            resp = c.get("/api/users/get/user/profile", headers=headers)
+            self.assertEqual("tim", resp.get_json()["first_name"])
+
+            user = Users.query.filter_by(username="test").first()
+            user.first_name = "timothy"
+            db.session.commit()
+
+            resp = c.get("/api/users/get/user/profile", headers=headers)
+            json_data = resp.get_json()
+
+            self.assertEqual(200, resp.status_code, msg=json_data)
+            self.assertEqual("timothy", json_data["first_name"])
+            self.assertNotIn("password_hash", json_data)
+
+    def test_warm_identity_cache_skips_user_select(self):
+        store = IdentityStore()
+        self.app.user_cache = UserIdentityCache(store)
+
+        with self.app.test_client() as c:
+            setup_access_token = register_and_login_test_user(c)
+            headers = {"Authorization": "Bearer {}".format(setup_access_token)}
+
+            c.get("/api/posts/get/user/posts", headers=headers)
+            self.assertIn("user-identity:1", store.keys)
+
+            # The local cache of this worker, then Redis for a worker which starts cold
+            for user_cache in (self.app.user_cache, UserIdentityCache(store)):
+                self.app.user_cache = user_cache
+
+                with capture_queries(db.engine) as queries:
+                    resp = c.get("/api/posts/get/user/posts", headers=headers)
+
+                self.assertEqual(200, resp.status_code, msg=resp.get_json())
+                self.assertEqual(
+                    [], [q for q, _ in queries if "FROM users" in q], msg=queries
+                )
+
+    def test_identity_changed_during_miss_is_not_cached(self):
+        store = IdentityStore()
+        user_cache = UserIdentityCache(store)
+
+        with self.app.test_client() as c:
+            register_and_login_test_user(c)
+
+        read_from_database = user_cache._get_from_database
+
+        def read_then_change(user_id):
+            # Another worker commits a change of the user after the row was read
+            identity = read_from_database(user_id)
+            UserIdentityCache(store).invalidate(user_id)
+            return identity
+
+        user_cache._get_from_database = read_then_change
+
+        self.assertEqual(1, user_cache.get(1)["id"])
+        self.assertNotIn("user-identity:1", store.keys)
+
+        user_cache._get_from_database = read_from_database
+        UserIdentityCache(store).get(1)
+        self.assertIn("user-identity:1", store.keys)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,35 +1,50 @@
-from flask import Response
+from flask import Response, current_app
 from flask_jwt_extended import current_user, jwt_required
 
 from app.errors.handlers import bad_request
+from app.helpers.field_helpers import select_fields
+from app.helpers.query_budget_helpers import query_budget
+from app.helpers.replica_helpers import read_only
 from app.models import Users
 from app.schemas import UsersSchema
+from app.serializers import compile_schema
 from app.users import bp
 
 # Declare database schemas so they can be returned as JSON objects
 user_schema = UsersSchema(exclude=("email", "password_hash"))
 users_schema = UsersSchema(many=True, exclude=("email", "password_hash"))
+user_serializer = compile_schema(user_schema)
 
 
 @bp.get("/get/user/profile")
+@query_budget(2)
 @jwt_required()
 def user_page() -> tuple[Response, int] | str:
     """
-    Let's users retrieve their own user information when logged in
+    Let's users retrieve their own user information when logged in. The `fields`
+    query parameter selects the returned fields
 
     Returns
     -------
     str
         A JSON object containing the user profile information
     """
-    return user_schema.jsonify(current_user), 200
+    try:
+        serializer = select_fields(user_serializer)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    return serializer.jsonify(current_user), 200
 
 
 @bp.get("/get/user/profile/<string:username>")
+@query_budget(3)
 @jwt_required()
-def get_user(username: str) -> tuple[Response, int] | Response:
+@read_only
+async def get_user(username: str) -> tuple[Response, int] | Response:
     """
-    Lets users retrieve a user profile when logged in
+    Lets users retrieve a user profile when logged in, read through an async session.
+    The `fields` query parameter selects the returned fields
 
     Parameters
     ----------
@@ -41,9 +56,17 @@ def get_user(username: str) -> tuple[Response, int] | Response:
     str
         A JSON object containing the user profile information
     """
-    user = Users.query.filter_by(username=username).first()
+    try:
+        serializer = select_fields(user_serializer)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    result = await current_app.async_db.execute(
+        serializer.select().where(Users.username == username)
+    )
+    user = result.first()
 
     if user is None:
         return bad_request("User not found")
 
-    return user_schema.jsonify(user), 200
+    return serializer.jsonify(user), 200
@@ -0,0 +1,84 @@
+"""
+Benchmark of the two ASYNC_VIEW_MODE settings: Flask's default of running every async
+view on a new event loop against the persistent per-worker loop.
+
+Run from the repository root with:
+
+    python -m benchmarks.async_view_loop --requests 500
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import ClientSession
+from flask import Flask
+
+from app.helpers.async_helpers import EventLoopThread
+from app.helpers.http_helpers import HTTPClient
+from app.helpers.test_helpers import start_stub_upstream
+
+
+def measure(name: str, view, requests: int) -> None:
+    start = time.perf_counter()
+
+    for _ in range(requests):
+        view()
+
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<40} {:>8.1f} req/s {:>8.3f} ms/req".format(
+            name, requests / elapsed, elapsed * 1000 / requests
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server, url, _ = start_stub_upstream([{"id": i} for i in range(100)])
+    per_request = Flask(__name__)
+    loop_thread = EventLoopThread("benchmark-event-loop")
+    client = HTTPClient(loop_thread, ttl=0, stale_ttl=0)
+
+    async def empty_view():
+        await asyncio.sleep(0)
+
+    async def fetch_with_new_session():
+        async with ClientSession() as session:
+            async with session.get(url) as response:
+                return await response.json()
+
+    async def fetch_with_shared_client():
+        return await client.get_json(url)
+
+    try:
+        measure(
+            "empty view, loop per request",
+            per_request.async_to_sync(empty_view),
+            args.requests,
+        )
+        measure(
+            "empty view, persistent loop",
+            loop_thread.async_to_sync(empty_view),
+            args.requests,
+        )
+        measure(
+            "upstream call, loop per request",
+            per_request.async_to_sync(fetch_with_new_session),
+            args.requests,
+        )
+        measure(
+            "upstream call, persistent loop",
+            loop_thread.async_to_sync(fetch_with_shared_client),
+            args.requests,
+        )
+
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,159 @@ class Config(object):
     ) or "sqlite:///" + os.path.join(basedir, "app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Read replicas of the primary database as a comma separated list of URIs, bound
+    # as "replica_0", "replica_1", ... Read only views use a replica unless the user
+    # wrote within the last REPLICA_PIN_SECONDS
+    SQLALCHEMY_BINDS = {
+        "replica_{}".format(i): uri
+        for i, uri in enumerate(
+            filter(None, (os.environ.get("DATABASE_REPLICA_URLS") or "").split(","))
+        )
+    }
+    REPLICA_PIN_SECONDS = 5
+
+    # Engine tuning profile from app/helpers/engine_helpers.py: "default",
+    # "high-concurrency" or "low-memory". It sets the pool, the statement cache and for
+    # SQLite the WAL journal, synchronous, busy_timeout and mmap_size pragmas
+    DATABASE_ENGINE_PROFILE = os.environ.get("DATABASE_ENGINE_PROFILE") or "default"
+
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ["access", "refresh"]
 
+    # Sizing of the in-process Bloom filter in front of the Redis revocation store and
+    # the maximum number of seconds before revocations from other workers are seen
+    JWT_REVOCATION_BLOOM_CAPACITY = 100000
+    JWT_REVOCATION_BLOOM_ERROR_RATE = 0.001
+    JWT_REVOCATION_SYNC_INTERVAL = 1.0
+
+    # Removal of old rows from the revoked token table by `flask remove-old-jwts`
+    JWT_REVOCATION_RETENTION_DAYS = 5
+    JWT_REVOCATION_PURGE_CHUNK_SIZE = 1000
+    JWT_REVOCATION_PURGE_INTERVAL = 3600
+
+    # Per-process LRU and shared Redis cache of the user identities behind current_user
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 30.0
+    USER_CACHE_REDIS_TTL = 300
+
+    # Home timelines cached in Redis, capped to the newest TIMELINE_MAX_LENGTH posts and
+    # dropped TIMELINE_TTL seconds after their last change
+    TIMELINE_MAX_LENGTH = 800
+    TIMELINE_TTL = 24 * 60 * 60
+
+    # Werkzeug hashing method of new password hashes including its cost, existing
+    # hashes are regenerated on login when it changes. Hashing runs in a pool of
+    # PASSWORD_HASH_WORKERS processes (unset for one per CPU, 0 to hash in the request
+    # thread) and auth requests get a 503 once PASSWORD_HASH_MAX_PENDING jobs wait
+    PASSWORD_HASH_METHOD = (
+        os.environ.get("PASSWORD_HASH_METHOD") or "pbkdf2:sha256:600000"
+    )
+    PASSWORD_HASH_WORKERS = (
+        int(os.environ["PASSWORD_HASH_WORKERS"])
+        if os.environ.get("PASSWORD_HASH_WORKERS")
+        else None
+    )
+    PASSWORD_HASH_MAX_PENDING = 32
+
+    # JSON engine for responses and request bodies: "auto" uses orjson when it is
+    # installed, "orjson" requires it and "json" forces the standard library.
+    # JSON_SORT_KEYS = False skips sorting the keys of every response object
+    JSON_ENGINE = os.environ.get("JSON_ENGINE") or "auto"
+    JSON_SORT_KEYS = True
+    JSON_PRETTYPRINT = False
+
+    # Page sizes of the keyset paginated list endpoints
+    PAGINATION_DEFAULT_LIMIT = 20
+    PAGINATION_MAX_LIMIT = 100
+
+    # Number of rows fetched and serialized at a time by the streamed list endpoints
+    STREAMING_CHUNK_SIZE = 500
+
+    # Server-Sent Events stream of background task progress: the maximum number of
+    # open streams per worker, the heartbeat interval in seconds and the reconnection
+    # delay in milliseconds suggested to clients
+    TASK_PROGRESS_MAX_STREAMS = 100
+    TASK_PROGRESS_HEARTBEAT = 15
+    TASK_PROGRESS_RETRY = 3000
+
+    # Number of seconds the latest progress of a user's tasks is kept after the last
+    # update, reconnecting clients are sent what changed while they were away
+    TASK_PROGRESS_REPLAY_TTL = 86400
+
+    # Progress updates of background tasks are only written once they moved at least
+    # this many percent or this many seconds passed since the last write
+    TASK_PROGRESS_MIN_DELTA = 5
+    TASK_PROGRESS_MIN_INTERVAL = 1.0
+
+    # "persistent" runs async views on a long-lived event loop per worker, "per-request"
+    # keeps Flask's default of a new event loop for every request. Async views must not
+    # block in persistent mode as they share the loop with every other request
+    ASYNC_VIEW_MODE = os.environ.get("ASYNC_VIEW_MODE") or "persistent"
+
+    # The number of requests served concurrently by one process behind an ASGI server.
+    # Progress streams hold a thread while open, the pool has TASK_PROGRESS_MAX_STREAMS
+    # more threads so they can not starve the other requests
+    ASGI_WORKER_THREADS = int(os.environ.get("ASGI_WORKER_THREADS") or 32)
+
+    # URI of the async engine serving the hot read endpoints. When unset it is derived
+    # from SQLALCHEMY_DATABASE_URI if aiosqlite or asyncpg is installed, otherwise
+    # those endpoints use the regular synchronous session
+    SQLALCHEMY_ASYNC_DATABASE_URI = os.environ.get("SQLALCHEMY_ASYNC_DATABASE_URI")
+
+    # Upstream API of the async demo endpoints and the shared HTTP client calling it:
+    # connection limits, the request timeout in seconds and the response cache
+    EXTERNAL_API_URL = (
+        os.environ.get("EXTERNAL_API_URL") or "https://jsonplaceholder.typicode.com"
+    )
+    HTTP_CLIENT_LIMIT = 100
+    HTTP_CLIENT_LIMIT_PER_HOST = 10
+    HTTP_CLIENT_TIMEOUT = 10.0
+    HTTP_CACHE_TTL = 60.0
+    HTTP_CACHE_STALE_TTL = 300.0
+    HTTP_CACHE_MAX_ENTRIES = 256
+
+    # Rate limits shared by all workers through Redis with a moving window. Set the
+    # strategy to "moving-window-prefetch" to reserve RATELIMIT_PREFETCH_SIZE hits per
+    # Redis round trip, at the cost of admitting up to that many extra hits per worker
+    # in a window. Limits fall back to worker memory while Redis is unavailable
+    RATELIMIT_STORAGE_URI = (
+        os.environ.get("RATELIMIT_STORAGE_URI")
+        or os.environ.get("REDIS_URL")
+        or "redis://"
+    )
+    RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY") or "moving-window"
+    RATELIMIT_PREFETCH_SIZE = 10
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    RATELIMIT_KEY_PREFIX = "rate-limit"
+    RATELIMIT_DEFAULT = "200 per day;50 per hour"
+    RATELIMIT_AUTH = "60 per minute"
+
+    # Prometheus metrics of the requests, their SQL statements and Redis commands at
+    # /metrics. Off by default as they show the traffic and latency of every endpoint,
+    # with METRICS_TOKEN set scrapers have to send it as a bearer token. Set
+    # PROMETHEUS_MULTIPROC_DIR to an empty directory when running multiple worker
+    # processes so /metrics aggregates all of them. SERVER_TIMING_ENABLED adds the
+    # per-request timings as a Server-Timing header, None adds it in debug mode only as
+    # it tells clients how many queries each request ran
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED") == "1"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    SERVER_TIMING_ENABLED = None
+
+    # Development and test check of the SQL statements per request: "warn" logs and
+    # "raise" fails requests which exceed the query budget of their route or repeat a
+    # statement QUERY_REPEAT_THRESHOLD times, "off" disables the check
+    QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE") or "off"
+    QUERY_REPEAT_THRESHOLD = 3
+
+    # JSON lines log files written off the request path when not debugging. Only a
+    # LOG_INFO_SAMPLE_RATE fraction of the INFO records is kept, warnings and errors
+    # are always written
+    LOG_DIR = os.environ.get("LOG_DIR") or "logs"
+    LOG_FILE = "flask_api.log"
+    LOG_LEVEL = os.environ.get("LOG_LEVEL") or "INFO"
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 10
+    LOG_INFO_SAMPLE_RATE = float(os.environ.get("LOG_INFO_SAMPLE_RATE") or 1.0)
+
     REDIS_URL = os.environ.get("REDIS_URL") or "redis://"
@@ -1,42 +1,132 @@
-from datetime import datetime
+import click
 
-from dateutil.relativedelta import relativedelta
-
-from app import create_app, db
+from app import create_app
 
 app = create_app()
 
 
 @app.cli.command()
-def remove_old_jwts():
+@click.option(
+    "--days",
+    type=int,
+    default=None,
+    help="Retention window in days, defaults to JWT_REVOCATION_RETENTION_DAYS.",
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=None,
+    help="Rows deleted per statement, defaults to JWT_REVOCATION_PURGE_CHUNK_SIZE.",
+)
+@click.option(
+    "--expired", is_flag=True, help="Also remove tokens which already expired."
+)
+@click.option(
+    "--dry-run", is_flag=True, help="Only count the tokens which would be removed."
+)
+@click.option(
+    "--schedule",
+    is_flag=True,
+    help="Run periodically as an RQ job instead (needs a worker --with-scheduler).",
+)
+@click.option("--unschedule", is_flag=True, help="Stop the periodic removal.")
+def remove_old_jwts(
+    days: int | None,
+    chunk_size: int | None,
+    expired: bool,
+    dry_run: bool,
+    schedule: bool,
+    unschedule: bool,
+):
     """
-    Scan the database for JWT tokens in the Revoked Token table older than 5 days
-    and remove them.
+    Scan the database for JWT tokens in the Revoked Token table older than the
+    retention window and remove them in chunks.
     """
 
     # Import within the function to prevent working outside of application context
     # when calling flask --help
-    from app.models import RevokedTokenModel
+    from app.helpers.revocation_helpers import (
+        remove_old_tokens,
+        schedule_token_removal,
+        unschedule_token_removal,
+    )
 
-    delete_date = datetime.utcnow() - relativedelta(days=5)
+    if unschedule:
+        if unschedule_token_removal():
+            print("Stopped the periodic removal of old tokens")
 
-    old_tokens = (
-        db.session.query(RevokedTokenModel)
-        .filter(RevokedTokenModel.date_revoked < delete_date)
-        .all()
-    )
+        else:
+            print("The removal of old tokens was not scheduled")
+
+        return
+
+    days = days if days is not None else app.config["JWT_REVOCATION_RETENTION_DAYS"]
+    chunk_size = chunk_size or app.config["JWT_REVOCATION_PURGE_CHUNK_SIZE"]
+
+    if schedule:
+        if schedule_token_removal(
+            days=days, chunk_size=chunk_size, include_expired=expired
+        ):
+            print(
+                "Scheduled removal of old tokens every {} seconds".format(
+                    app.config["JWT_REVOCATION_PURGE_INTERVAL"]
+                )
+            )
+
+        else:
+            print(
+                "The removal of old tokens is already scheduled, stop it with "
+                "--unschedule first"
+            )
 
-    if old_tokens:
-        for token in old_tokens:
-            db.session.delete(token)
+        return
 
-        db.session.commit()
+    if dry_run:
+        count = remove_old_tokens(days, include_expired=expired, dry_run=True)
+        print("{} old tokens would be removed from the database".format(count))
+        return
 
-        print(
-            "{} old tokens have been removed from the database".format(len(old_tokens))
-        )
+    removed = remove_old_tokens(
+        days,
+        chunk_size=chunk_size,
+        include_expired=expired,
+        progress=lambda total: print("Removed {} tokens...".format(total)),
+    )
+
+    if removed:
+        print("{} old tokens have been removed from the database".format(removed))
 
     else:
-        print("No JWT's older than 5 days have been found")
+        print("No JWT's older than {} days have been found".format(days))
+
+
+@app.cli.command()
+@click.option(
+    "--chunk-size", type=int, default=500, help="Users updated per statement."
+)
+def rebuild_counters(chunk_size: int):
+    """
+    Recount the posts and comments of every user and post from the source tables and
+    correct the denormalized counts which drifted.
+    """
+
+    # Import within the function to prevent working outside of application context
+    # when calling flask --help
+    from app.helpers.counter_helpers import rebuild_counters
+
+    users, posts = rebuild_counters(chunk_size=chunk_size)
+
+    print("Corrected the counts of {} users and {} posts".format(users, posts))
+
+
+@app.cli.command()
+def reindex_search():
+    """
+    Rebuild the full-text search index of the posts and comments.
+    """
+
+    # Import within the function to prevent working outside of application context
+    # when calling flask --help
+    from app.helpers.search_helpers import reindex
 
-    return old_tokens
+    print("Indexed {} posts and comments".format(reindex()))